@@ -1,21 +1,25 @@
 from __future__ import annotations
-from re import A, L
 
 from typing import Optional, Tuple, TYPE_CHECKING
-from xmlrpc.server import DocXMLRPCRequestHandler
 
 import color
 import exceptions
+from slots import restore_slots
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Actor, Entity, Item
 
 class Action:
+    __slots__ = ("entity",)
+
     def __init__(self, entity: Actor) -> None:
         super().__init__()
         self.entity = entity
 
+    def __setstate__(self, state: object) -> None:
+        restore_slots(self, state)
+
     @property
     def engine(self) -> Engine:
         """Return the engine that this action belongs to"""
@@ -38,6 +42,9 @@ class PickupAction(Action):
     """
     Pick up an item and add it to the inventory if there is enough room
     """
+
+    __slots__ = ()
+
     def __init__(self, entity: Actor):
         super().__init__(entity)
 
@@ -51,7 +58,7 @@ class PickupAction(Action):
                 if len(inventory.items) >= inventory.capacity:
                     raise exceptions.Impossible("Your inventory is full")
 
-                self.engine.game_map.entities.remove(item)
+                self.engine.game_map.remove_entity(item)
                 item.parent = self.entity.inventory
                 inventory.items.append(item)
 
@@ -61,6 +68,8 @@ class PickupAction(Action):
         raise exceptions.Impossible("There is nothing here to pick up")
 
 class ItemAction(Action):
+    __slots__ = ("item", "target_xy")
+
     def __init__(
         self,
         entity: Actor,
@@ -83,14 +92,39 @@ class ItemAction(Action):
         self.item.consumable.activate(self)
 
 class DropItem(ItemAction):
+    __slots__ = ()
+
     def perform(self) -> None:
         self.entity.inventory.drop(self.item)
 
 class WaitAction(Action):
+    __slots__ = ()
+
     def perform(self) -> None:
         pass
 
+class LevelUpAction(Action):
+    """Spend a pending level up on one attribute, this doesn't take a turn"""
+
+    __slots__ = ("attribute",)
+
+    attributes = ("max_hp", "power", "defense")
+
+    def __init__(self, entity: Actor, attribute: str):
+        super().__init__(entity)
+        if attribute not in self.attributes:
+            raise ValueError(f"Unknown attribute {attribute!r}")
+        self.attribute = attribute
+
+    def perform(self) -> None:
+        level = self.entity.level
+        if not level.requires_level_up:
+            raise exceptions.Impossible("You have no level up to spend")
+        getattr(level, f"increase_{self.attribute}")()
+
 class TakeStairsAction(Action):
+    __slots__ = ()
+
     def perform(self) -> None:
         """
         Take the stairs, if any exist at the entity's location
@@ -104,6 +138,8 @@ class TakeStairsAction(Action):
             raise exceptions.Impossible("There are no stairs here")
 
 class ActionWithDirection(Action):
+    __slots__ = ("dx", "dy")
+
     def __init__(self, entity: Actor, dx: int, dy: int):
         super().__init__(entity)
 
@@ -129,6 +165,8 @@ class ActionWithDirection(Action):
         raise NotImplementedError()
 
 class MeleeAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         target = self.target_actor
         if not target:
@@ -154,6 +192,8 @@ class MeleeAction(ActionWithDirection):
 
 
 class BumpAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         if self.target_actor:
             return MeleeAction(self.entity, self.dx, self.dy).perform()
@@ -161,6 +201,7 @@ class BumpAction(ActionWithDirection):
             return MovementAction(self.entity, self.dx, self.dy).perform()
 
 class MovementAction(ActionWithDirection):
+    __slots__ = ()
 
     def perform(self) -> None:
         dest_x, dest_y = self.dest_xy
@@ -168,7 +209,7 @@ class MovementAction(ActionWithDirection):
         if not self.engine.game_map.in_bounds(dest_x, dest_y):
             # destination out of bounds
             raise exceptions.Impossible("That way is blocked.")
-        if not self.engine.game_map.tiles["walkable"][dest_x, dest_y]:
+        if not self.engine.game_map.walkable[dest_x, dest_y]:
             # destination blocked by a tile
             raise exceptions.Impossible("That way is blocked.")
         if self.engine.game_map.get_blocking_entity_at_location(dest_x, dest_y):
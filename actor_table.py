@@ -0,0 +1,113 @@
+"""Array-backed storage for the state of every actor on a GameMap"""
+from __future__ import annotations
+
+from typing import Iterator, List, Optional, TYPE_CHECKING
+
+import numpy as np # type: ignore
+
+from stencils import disk_stencil
+
+if TYPE_CHECKING:
+    from entity import Actor
+
+
+class ActorTable:
+    """
+    Holds position, hp, power, defense and alive flag of a map's actors as NumPy columns
+
+    Each actor on the map owns one row, Actor and Fighter read and write their row,
+    so queries over every actor (radius checks, deaths, positions) are vector operations
+    Rows of removed actors are reused by later actors
+    """
+
+    columns = ("x", "y", "hp", "power", "defense", "alive")
+
+    def __init__(self, capacity: int = 64):
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.hp = np.zeros(capacity, dtype=np.int32)
+        self.power = np.zeros(capacity, dtype=np.int32)
+        self.defense = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        self.actors: List[Optional[Actor]] = [None] * capacity # the actor owning each row
+        self.size = 0 # rows in use or freed, everything past this is untouched
+        self.free_rows: List[int] = []
+
+    def __len__(self) -> int:
+        return self.size - len(self.free_rows)
+
+    def _grow(self) -> None:
+        capacity = len(self.actors) * 2
+        for column in self.columns:
+            array = getattr(self, column)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[: len(array)] = array
+            setattr(self, column, grown)
+        self.actors.extend([None] * (capacity - len(self.actors)))
+
+    def add(self, actor: Actor) -> int:
+        """Give 'actor' a row, filled from its current state, and return the row"""
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.size == len(self.actors):
+                self._grow()
+            row = self.size
+            self.size += 1
+
+        self.actors[row] = actor
+        self.x[row] = actor.x
+        self.y[row] = actor.y
+        self.hp[row] = actor.fighter.hp
+        self.power[row] = actor.fighter.power
+        self.defense[row] = actor.fighter.defense
+        self.alive[row] = actor.ai is not None
+        return row
+
+    def remove(self, row: int) -> None:
+        """Free 'row', the actor which owned it should have copied out its state first"""
+        self.actors[row] = None
+        self.alive[row] = False
+        self.free_rows.append(row)
+
+    def live_rows(self) -> np.ndarray:
+        """Return the rows of every living actor"""
+        return np.flatnonzero(self.alive[: self.size])
+
+    def live_actors(self) -> Iterator[Actor]:
+        actors = self.actors
+        for row in self.live_rows().tolist():
+            yield actors[row] # type: ignore
+
+    def rows_at(self, x: int, y: int) -> np.ndarray:
+        """Return the rows of living actors standing at x, y"""
+        size = self.size
+        return np.flatnonzero(self.alive[:size] & (self.x[:size] == x) & (self.y[:size] == y))
+
+    def rows_within_radius(self, x: int, y: int, radius: int) -> np.ndarray:
+        """Return the rows of living actors on the disk_stencil of 'radius' around x, y"""
+        size = self.size
+        stencil = disk_stencil(radius)
+        # offsets into the stencil, out of range offsets are clipped and then masked out
+        dx = self.x[:size] - (x - radius)
+        dy = self.y[:size] - (y - radius)
+        inside = self.alive[:size] & (dx >= 0) & (dx <= 2 * radius) & (dy >= 0) & (dy <= 2 * radius)
+        inside &= stencil[np.clip(dx, 0, 2 * radius), np.clip(dy, 0, 2 * radius)]
+        return np.flatnonzero(inside)
+
+    def distances_squared(self, rows: np.ndarray, x: int, y: int) -> np.ndarray:
+        """Return the squared distance from x, y to the actor of each row"""
+        dx = self.x[rows] - x
+        dy = self.y[rows] - y
+        return dx * dx + dy * dy
+
+    def damage(self, rows: np.ndarray, amount: int) -> np.ndarray:
+        """
+        Subtract 'amount' of hp from every actor in 'rows', stopping at 0
+
+        Returns the rows which were alive and have now reached 0 hp,
+        their actors still need Fighter.die to be called
+        """
+        self.hp[rows] = np.maximum(self.hp[rows] - amount, 0)
+        return rows[(self.hp[rows] == 0) & self.alive[rows]]
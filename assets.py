@@ -0,0 +1,97 @@
+"""
+The images the game loads from disk, each loaded on first use rather than at import
+
+The menu background can also be decoded on a background thread while the window opens
+Decoded images are cached as .npy files in CACHE_DIRECTORY, keyed by a hash of their source file,
+so later launches memory-map the pixels instead of decoding the PNG again
+"""
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import random
+import threading
+from typing import Callable, Optional
+
+import numpy as np # type: ignore
+import tcod
+
+TILESET = "terminal.png"
+MENU_BACKGROUNDS = ("menu_background.png", "menu_background_2.png")
+CACHE_DIRECTORY = ".asset_cache"
+
+_tileset: Optional[tcod.tileset.Tileset] = None
+_menu_background: Optional[np.ndarray] = None
+_loader: Optional[threading.Thread] = None
+
+
+def cached_array(source: str, decode: Callable[[], np.ndarray]) -> np.ndarray:
+    """
+    Return the array decode() makes from 'source', read-only and memory-mapped from the cache
+    when it holds one for the current contents of 'source', otherwise decoded and stored
+
+    If the cache can't be written, e.g. a read-only install, the decoded array is returned as is
+    """
+    with open(source, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(CACHE_DIRECTORY, f"{stem}-{digest}.npy")
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError): # missing, or left truncated by a crash
+        pass
+
+    array = np.ascontiguousarray(decode())
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        for stale in glob.glob(os.path.join(CACHE_DIRECTORY, f"{stem}-*.npy")):
+            os.remove(stale)
+        # written aside then renamed, so a reader never maps a half written file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.save(f, array)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+    return array
+
+
+def tileset() -> tcod.tileset.Tileset:
+    """
+    The tileset is not cached, tcod can only build one from an array a tile at a time,
+    which takes about three times as long as decoding the tilesheet
+    """
+    global _tileset
+    if _tileset is None:
+        _tileset = tcod.tileset.load_tilesheet(TILESET, 16, 16, tcod.tileset.CHARMAP_CP437)
+    return _tileset
+
+
+def _load_menu_background(filename: str) -> None:
+    global _menu_background
+    # remove the alpha channel
+    _menu_background = cached_array(filename, lambda: tcod.image.load(filename)[:, :, :3])
+
+
+def preload_menu_background() -> None:
+    """Start decoding the menu background on a background thread, menu_background() waits for it"""
+    global _loader
+    if _loader is None and _menu_background is None:
+        # picked here so the loader thread never touches the shared random state
+        _loader = threading.Thread(
+            target=_load_menu_background, args=(random.choice(MENU_BACKGROUNDS),), daemon=True
+        )
+        _loader.start()
+
+
+def menu_background() -> np.ndarray:
+    """Return one of MENU_BACKGROUNDS as RGB, picked at random once per run"""
+    global _loader
+    if _loader is not None:
+        _loader.join()
+        _loader = None
+    if _menu_background is None:
+        _load_menu_background(random.choice(MENU_BACKGROUNDS))
+    assert _menu_background is not None
+    return _menu_background
@@ -0,0 +1,172 @@
+"""Player commands which take many turns, such as travelling, exploring and resting"""
+from __future__ import annotations
+
+import math
+from typing import Optional, Tuple, TYPE_CHECKING
+
+import numpy as np # type: ignore
+import tcod
+
+from actions import Action, MovementAction, WaitAction
+from exceptions import Impossible
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (1, -1), (-1, 1), (1, 1))
+
+
+def distance_map(cost: np.ndarray, goals: np.ndarray) -> np.ndarray:
+    """
+    Return the walking distance from every tile to the nearest True tile of 'goals'
+
+    Uses the same step costs as monster pathfinding, unreachable tiles are left at the maximum
+    """
+    distance = tcod.path.maxarray(cost.shape, dtype=np.int32, order="F")
+    distance[goals] = 0
+    tcod.path.dijkstra2d(distance, cost, 2, 3, out=distance)
+    return distance
+
+
+def step_downhill(distance: np.ndarray, x: int, y: int) -> Optional[Tuple[int, int]]:
+    """Return the direction of the neighbour of x, y with the lowest distance, if it is lower than x, y"""
+    width, height = distance.shape
+    best = None
+    best_distance = distance[x, y]
+    for dx, dy in DIRECTIONS:
+        next_x, next_y = x + dx, y + dy
+        if 0 <= next_x < width and 0 <= next_y < height and distance[next_x, next_y] < best_distance:
+            best = dx, dy
+            best_distance = distance[next_x, next_y]
+    return best
+
+
+class AutoCommand:
+    """
+    A command which chooses one player action per turn until it is done or interrupted
+
+    EventHandler.handle_command performs the turns back to back without rendering in between,
+    stopping when an enemy is in view or the player loses hp
+    """
+
+    max_turns = 1000
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.turns = 0
+        self.last_hp = engine.player.fighter.hp
+
+    def interruption(self) -> Optional[str]:
+        """Return why the command should stop before the next turn, or None to carry on"""
+        player = self.engine.player
+        hp, self.last_hp = self.last_hp, player.fighter.hp
+        if player.fighter.hp < hp:
+            return "You stop, you have been hurt"
+        if self.engine.game_map.nearest_visible_actor(player.x, player.y, math.inf, exclude=player):
+            return "You stop, there is an enemy in view"
+        return None
+
+    def next_action(self) -> Optional[Action]:
+        """
+        Return the action for the next turn, or None when the command is finished
+
+        Raises Impossible to stop with a message, such as when the command can't start
+        """
+        raise NotImplementedError()
+
+    def walk_downhill(self, distance: np.ndarray, origin: Tuple[int, int]) -> Optional[Action]:
+        """Return a step down 'distance', a map of the region starting at 'origin', or None at the bottom"""
+        player = self.engine.player
+        direction = step_downhill(distance, player.x - origin[0], player.y - origin[1])
+        if direction is None:
+            return None
+        return MovementAction(player, *direction)
+
+
+class TravelCommand(AutoCommand):
+    """Walk to a chosen explored tile"""
+
+    def __init__(self, engine: Engine, x: int, y: int):
+        super().__init__(engine)
+        self.target = x, y
+        self.distance: Optional[np.ndarray] = None
+        self.origin = 0, 0
+
+    def next_action(self) -> Optional[Action]:
+        if self.distance is None:
+            game_map = self.engine.game_map
+            player = self.engine.player
+            x, y = self.target
+            if not game_map.explored[x, y] or not game_map.walkable[x, y]:
+                raise Impossible("You don't know a way there")
+
+            window = game_map.path_window(player.x, player.y, x, y)
+            self.origin = window[0].start, window[1].start
+            # only travel through tiles the player has seen
+            cost = np.asarray(game_map.walkable[window]) & np.asarray(game_map.explored[window])
+            goals = np.zeros(cost.shape, dtype=bool)
+            goals[x - self.origin[0], y - self.origin[1]] = True
+            self.distance = distance_map(cost.astype(np.int8), goals)
+            if self.distance[player.x - self.origin[0], player.y - self.origin[1]] == np.iinfo(np.int32).max:
+                raise Impossible("You don't know a way there")
+
+        return self.walk_downhill(self.distance, self.origin)
+
+
+class ExploreCommand(AutoCommand):
+    """Walk towards the nearest unexplored area until the whole reachable map has been seen"""
+
+    def next_action(self) -> Optional[Action]:
+        player = self.engine.player
+        # the map changes as it is explored, so the distances are recomputed every turn
+        for window in self.engine.game_map.search_windows(player.x, player.y):
+            action = self.step_in(window)
+            if action is not None:
+                return action
+        raise Impossible("There is nowhere left to explore")
+
+    def step_in(self, window: Tuple[slice, slice]) -> Optional[Action]:
+        """Return a step towards the nearest frontier reachable within 'window', if there is one"""
+        game_map = self.engine.game_map
+        explored = np.asarray(game_map.explored[window])
+        cost = np.asarray(game_map.walkable[window]) & explored
+        width, height = explored.shape
+
+        # the frontier is every known walkable tile next to an unexplored tile,
+        # tiles outside the window count as explored, a larger window finds the frontier there
+        unexplored = np.pad(~explored, 1, constant_values=False)
+        next_to_unexplored = np.zeros_like(explored)
+        for dx, dy in DIRECTIONS:
+            next_to_unexplored |= unexplored[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+        frontier = cost & next_to_unexplored
+
+        if not frontier.any():
+            return None
+        origin = window[0].start, window[1].start
+        return self.walk_downhill(distance_map(cost.astype(np.int8), frontier), origin)
+
+
+class RestCommand(AutoCommand):
+    """
+    Wait until fully healed, or until max_turns have passed
+
+    Stops as soon as a turn of rest heals nothing, so without anything healing the player over time
+    resting costs one turn rather than max_turns
+    """
+
+    max_turns = 100
+
+    def __init__(self, engine: Engine):
+        super().__init__(engine)
+        self.rested_hp = engine.player.fighter.hp
+
+    def next_action(self) -> Optional[Action]:
+        fighter = self.engine.player.fighter
+        if fighter.hp >= fighter.max_hp:
+            if self.turns == 0:
+                raise Impossible("Your health is already full")
+            return None
+        if self.turns and fighter.hp <= self.rested_hp:
+            raise Impossible("Resting doesn't restore your health")
+        self.rested_hp = fighter.hp
+        return WaitAction(self.engine.player)
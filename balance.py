@@ -0,0 +1,122 @@
+"""
+Play many seeded headless games across all cores and summarize how they went
+
+Used to tune entity_factories: how deep the bot survives, how much damage it takes,
+which items it uses and how long games last
+
+    python balance.py [--games N] [--seed N] [--policy explore|random|module:Class]
+                      [--max-turns N] [--processes N] [--out FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import json
+import multiprocessing
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Type
+
+# set by init_worker, once per worker process
+_policy_class: Optional[Type[Any]] = None
+_max_turns = 0
+
+
+def init_worker(policy_name: str, max_turns: int) -> None:
+    """
+    Import the game and build everything shared between games once per worker
+
+    Games then only pay for their own generation and turns
+    """
+    global _policy_class, _max_turns
+    import headless
+    import spawn_tables
+
+    spawn_tables.load() # resolves the spawn tables and their prototypes
+    _policy_class = headless.load_policy(policy_name)
+    _max_turns = max_turns
+
+
+def play(seed: int) -> Dict[str, Any]:
+    import headless
+
+    assert _policy_class is not None, "init_worker has not run in this process"
+    return headless.run_game(_policy_class(), seed, _max_turns)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    def at(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {
+        "mean": round(statistics.fmean(ordered), 2),
+        "p10": at(0.1),
+        "p50": at(0.5),
+        "p90": at(0.9),
+        "max": ordered[-1],
+    }
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate the results of run_game into the balance summary"""
+    games = len(results)
+    items_used: Dict[str, int] = collections.Counter()
+    for result in results:
+        items_used.update(result["items_used"])
+    deaths_by_floor = collections.Counter(result["floor"] for result in results if result["died"])
+
+    return {
+        "games": games,
+        "death_rate": round(sum(result["died"] for result in results) / games, 3) if games else 0.0,
+        "floor_reached": percentiles([result["floor"] for result in results]),
+        "deaths_by_floor": {str(floor): count for floor, count in sorted(deaths_by_floor.items())},
+        "level_reached": percentiles([result["level"] for result in results]),
+        "turns_per_game": percentiles([result["turns"] for result in results]),
+        "damage_taken_per_game": percentiles([result["damage_taken"] for result in results]),
+        "damage_taken_per_turn": round(
+            sum(result["damage_taken"] for result in results)
+            / max(1, sum(result["turns"] for result in results)),
+            3,
+        ),
+        "items_used_per_game": {
+            name: round(count / games, 3) for name, count in sorted(items_used.items())
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, later games count up")
+    parser.add_argument("--policy", default="explore")
+    parser.add_argument("--max-turns", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to every core")
+    parser.add_argument("--out", default="balance_summary.json")
+    args = parser.parse_args()
+
+    seeds = range(args.seed, args.seed + args.games)
+    start = time.perf_counter()
+    with multiprocessing.Pool(
+        args.processes, initializer=init_worker, initargs=(args.policy, args.max_turns)
+    ) as pool:
+        # small chunks keep every worker busy, game lengths vary a lot
+        results = list(pool.imap_unordered(play, seeds, chunksize=4))
+    seconds = time.perf_counter() - start
+
+    results.sort(key=lambda result: result["seed"])
+    summary = summarize(results)
+    summary["policy"] = args.policy
+    summary["max_turns"] = args.max_turns
+    summary["wall_seconds"] = round(seconds, 2)
+    summary["games_per_second"] = round(len(results) / seconds, 2)
+
+    for key, value in summary.items():
+        print(f"{key:>22}: {value}")
+    with open(args.out, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
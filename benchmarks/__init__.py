@@ -0,0 +1,6 @@
+"""
+Benchmarks for the game's hot paths, run from the repository root
+
+python -m benchmarks runs the standard suite, python -m benchmarks.<name> runs a single benchmark
+"""
+import quiet_warnings # noqa: F401, every benchmark imports the game
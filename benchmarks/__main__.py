@@ -0,0 +1,5 @@
+"""Run the standard suite, see benchmarks.suite"""
+from benchmarks.suite import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measure the memory cost of actors and of running turns
+
+Spawns actors into an open arena and reports the bytes each one costs and the time
+each spawn takes, then runs turns and reports the bytes allocated and blocks left behind per turn
+
+    python -m benchmarks.memory [--actors N] [--turns N] [--json FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict
+
+import actions
+import entity_factories
+from game_map import GameMap
+import setup_game
+import tile_types
+
+
+def build_arena(actor_count: int, seed: int):
+    """Return an engine whose map is an open arena with the player in the middle"""
+    random.seed(seed)
+    engine = setup_game.new_game()
+
+    size = max(40, int((actor_count * 4) ** 0.5))
+    arena = GameMap(engine, size, size)
+    arena.set_tiles((slice(0, size), slice(0, size)), tile_types.floor)
+
+    player = engine.player
+    player.fighter.max_hp = player.fighter.hp = 10 ** 6 # survive the whole run
+    player.place(size // 2, size // 2, arena)
+    engine.game_map = arena
+    return engine
+
+
+def measure(actor_count: int, turns: int, seed: int) -> Dict[str, float]:
+    engine = build_arena(actor_count, seed)
+    arena = engine.game_map
+
+    free_tiles = [
+        (x, y)
+        for x in range(arena.width)
+        for y in range(arena.height)
+        if (x, y) != (engine.player.x, engine.player.y)
+    ]
+    positions = random.sample(free_tiles, actor_count)
+
+    prototypes = [
+        entity_factories.menace if i % 2 else entity_factories.droid for i in range(actor_count)
+    ]
+
+    # time spawning on a throwaway map first, tracemalloc would skew the timing
+    scratch = GameMap(engine, arena.width, arena.height)
+    start = time.perf_counter()
+    for prototype, (x, y) in zip(prototypes, positions):
+        prototype.spawn(scratch, x, y)
+    spawn_seconds = time.perf_counter() - start
+    del scratch
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for prototype, (x, y) in zip(prototypes, positions):
+        prototype.spawn(arena, x, y)
+    gc.collect()
+    bytes_per_actor = (tracemalloc.get_traced_memory()[0] - before) / actor_count
+
+    engine.update_fov()
+    peak_total = 0
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(turns):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+
+        actions.WaitAction(engine.player).perform()
+        engine.handle_enemy_turns()
+        engine.update_fov()
+
+        peak_total += tracemalloc.get_traced_memory()[1] - start
+    gc.collect()
+    blocks_per_turn = (sys.getallocatedblocks() - blocks_before) / turns
+    tracemalloc.stop()
+
+    return {
+        "actors": actor_count,
+        "turns": turns,
+        "bytes_per_actor": round(bytes_per_actor, 1),
+        "microseconds_per_spawn": round(spawn_seconds / actor_count * 1e6, 2),
+        "peak_bytes_allocated_per_turn": round(peak_total / turns, 1),
+        "blocks_retained_per_turn": round(blocks_per_turn, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actors", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = measure(args.actors, args.turns, args.seed)
+    for key, value in results.items():
+        print(f"{key:>30}: {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure how many frames a second of fast mouse motion over the map renders
+
+Replays one second of motion sampled at --rate Hz, sweeping across the map a few pixels per sample,
+in batches of --batch events as tcod.event.wait would return them while a frame is drawn
+"before" dispatches every event and renders after every batch, like the main loop used to,
+"after" is main.handle_event_batch, which coalesces motion and skips renders which change nothing
+
+    python -m benchmarks.mouse_motion [--rate N] [--batch N] [--step PIXELS] [--json FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import tcod
+
+import input_handlers
+import main as game_main
+import setup_game
+
+TILE_WIDTH, TILE_HEIGHT = 8, 12 # terminal.png
+
+
+class PrecomputedTiles:
+    """Stands in for the tcod context, the events are built with their tiles already set"""
+
+    def convert_event(self, event: Any) -> None:
+        pass
+
+
+def motion_events(count: int, step: int, width: int, height: int) -> List[tcod.event.MouseMotion]:
+    """A sweep back and forth across the window, 'step' pixels per event"""
+    events = []
+    x, y, dx = 0.0, height * TILE_HEIGHT / 2, step
+    for _ in range(count):
+        x += dx
+        if not 0 <= x < width * TILE_WIDTH:
+            dx = -dx
+            x += 2 * dx
+        y = (y + step / 3) % (height * TILE_HEIGHT)
+        events.append(
+            tcod.event.MouseMotion(
+                position=tcod.event.Point(x, y),
+                tile=tcod.event.Point(int(x) // TILE_WIDTH, int(y) // TILE_HEIGHT),
+                motion=tcod.event.Point(dx, step / 3),
+            )
+        )
+    return events
+
+
+def run(events: List[tcod.event.MouseMotion], batch: int, coalesce: bool) -> Dict[str, float]:
+    engine = setup_game.new_game(0)
+    handler: input_handlers.BaseEventHandler = input_handlers.MainGameEventHandler(engine)
+    console = tcod.Console(engine.screen_width, engine.screen_height, order="F")
+    context = PrecomputedTiles()
+    handler.on_render(console) # places the map viewport, which maps tiles to the map
+
+    renders = 0
+    start = time.perf_counter()
+    for i in range(0, len(events), batch):
+        events_batch = events[i : i + batch]
+        if coalesce:
+            handler, changed = game_main.handle_event_batch(handler, events_batch, context)
+        else:
+            for event in events_batch:
+                context.convert_event(event)
+                handler = handler.handle_events(event)
+            changed = True
+        if changed:
+            console.clear()
+            handler.on_render(console)
+            renders += 1
+    seconds = time.perf_counter() - start
+
+    return {
+        "batches": -(-len(events) // batch),
+        "frames_rendered": renders,
+        "cpu_ms": round(seconds * 1e3, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=int, default=1000, help="motion events per second")
+    parser.add_argument("--batch", type=int, default=4, help="events returned by each wait")
+    parser.add_argument("--step", type=int, default=2, help="pixels moved per event")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    events = motion_events(args.rate, args.step, 80, 50)
+    results = {
+        "before": run(events, args.batch, coalesce=False),
+        "after": run(events, args.batch, coalesce=True),
+    }
+    for name, result in results.items():
+        print(f"{name:>6}: {result}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measure the time from launching the game to its first frame
+
+Each run is a fresh interpreter doing what main.main does up to presenting the main menu,
+the first frame is drawn off-screen unless --window is given, which needs a display
+
+    python -m benchmarks.startup [--runs N] [--window] [--json FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# runs in the child process, timings are seconds since the child's interpreter started running it
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import tcod
+import main, assets, setup_game
+imported = time.perf_counter()
+
+assets.preload_menu_background()
+handler = setup_game.MainMenu()
+console = tcod.Console(80, 50, order="F")
+if "--window" in sys.argv:
+    with tcod.context.new_terminal(80, 50, tileset=assets.tileset(), title="startup") as context:
+        windowed = time.perf_counter()
+        handler.on_render(console=console)
+        context.present(console)
+        first_frame = time.perf_counter()
+else:
+    assets.tileset()
+    windowed = time.perf_counter()
+    handler.on_render(console=console)
+    first_frame = time.perf_counter()
+
+print(json.dumps({
+    "imports": imported - start,
+    "window": windowed - imported,
+    "first_render": first_frame - windowed,
+    "in_process": first_frame - start,
+}))
+"""
+
+
+def run_once(window: bool) -> Dict[str, float]:
+    args = [sys.executable, "-c", CHILD] + (["--window"] if window else [])
+    start = time.perf_counter()
+    output = subprocess.run(args, check=True, capture_output=True, text=True).stdout
+    wall = time.perf_counter() - start
+    phases = json.loads(output.strip().splitlines()[-1])
+    # launching the interpreter itself, before any of the game's code ran
+    phases["wall"] = wall
+    return phases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--window", action="store_true", help="open a real window and present the frame")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    # the game loads its assets relative to the working directory
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    run_once(args.window) # warms the OS file cache
+    runs: List[Dict[str, float]] = [run_once(args.window) for _ in range(args.runs)]
+
+    results = {
+        f"{phase}_ms": round(statistics.median(run[phase] for run in runs) * 1e3, 2) for phase in runs[0]
+    }
+    results["runs"] = args.runs
+    for key, value in results.items():
+        print(f"{key:>16}: {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+The standard benchmark suite, timing every hot path at several map sizes and monster densities
+
+    python -m benchmarks [--quick] [--only NAME] [--repeat N] [--seed N] [--out FILE]
+                         [--compare BASELINE] [--threshold FRACTION]
+
+Results are written as JSON keyed by "path/WIDTHxHEIGHT/mN", N being the most monsters per room
+With --compare, every result whose median is over 'threshold' slower than the same result
+in the baseline file is flagged as a regression and the exit status is 1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np # type: ignore
+import tcod
+
+from engine import Engine
+import entity_factories
+from game_map import GameWorld
+from message_log import MessageLog
+import procgen
+import setup_game
+
+SIZES = ((80, 60), (160, 120), (320, 240))
+DENSITIES = (2, 6) # most monsters per room
+DEFAULT_OUT = "benchmark_results.json"
+DEFAULT_THRESHOLD = 0.2
+
+Samples = List[float]
+
+
+class Scenario:
+    """A generated floor of a given size and density, shared by every benchmark of it"""
+
+    def __init__(self, width: int, height: int, monsters_per_room: int, seed: int):
+        self.width = width
+        self.height = height
+        self.monsters_per_room = monsters_per_room
+        self.seed = seed
+        self.key = f"{width}x{height}/m{monsters_per_room}"
+
+        random.seed(seed)
+        player = entity_factories.player.clone()
+        self.engine = engine = Engine(player=player)
+        engine.game_world = GameWorld(
+            engine=engine,
+            map_width=width,
+            map_height=height,
+            # as many rooms per tile as the real game's 30 rooms on 80x60
+            max_rooms=max(30, 30 * width * height // (80 * 60)),
+            room_min_size=6,
+            room_max_size=10,
+            max_monsters_per_room=monsters_per_room,
+            max_items_per_room=2,
+        )
+        engine.game_world.generate_floor()
+        player.fighter.max_hp = player.fighter.hp = 10 ** 6 # survive every enemy turn
+        engine.update_fov()
+
+        for i in range(200):
+            engine.message_log.add_message(f"Message {i} " + "lorem ipsum " * (i % 7), (255, 255, 255))
+
+        self.console = tcod.Console(engine.screen_width, engine.screen_height, order="F")
+
+
+def timed(func: Callable[[], object], repeat: int) -> Samples:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_generate_dungeon(scenario: Scenario, repeat: int) -> Samples:
+    world = scenario.engine.game_world
+    samples = []
+    # generation is slow and moves the player, so it runs fewer times and on forks
+    for i in range(max(1, repeat // 20)):
+        fork = scenario.engine.fork()
+        random.seed(scenario.seed + i)
+        start = time.perf_counter()
+        procgen.generate_dungeon(
+            max_rooms=world.max_rooms,
+            room_min_size=world.room_min_size,
+            room_max_size=world.room_max_size,
+            map_width=world.map_width,
+            map_height=world.map_height,
+            max_monsters_per_room=world.max_monsters_per_room,
+            max_items_per_room=world.max_items_per_room,
+            engine=fork,
+        )
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_update_fov(scenario: Scenario, repeat: int) -> Samples:
+    return timed(scenario.engine.update_fov, repeat)
+
+
+def bench_get_path_to(scenario: Scenario, repeat: int) -> Samples:
+    engine = scenario.engine
+    player = engine.player
+    hunters = [actor for actor in engine.game_map.actors if actor is not player and actor.ai]
+    samples = []
+    for i in range(repeat if hunters else 0):
+        ai = hunters[i % len(hunters)].ai
+        start = time.perf_counter()
+        ai.get_path_to(player.x, player.y)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_handle_enemy_turns(scenario: Scenario, repeat: int) -> Samples:
+    samples = []
+    # every turn starts from the generated floor rather than from enemies crowding the player
+    for _ in range(repeat):
+        fork = scenario.engine.fork()
+        start = time.perf_counter()
+        fork.handle_enemy_turns()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_render_in_frame(scenario: Scenario, repeat: int) -> Samples:
+    engine = scenario.engine
+    console = scenario.console
+    def render() -> None:
+        engine.game_map.render_in_frame(
+            x=20, y=0, f_width=engine.screen_width - 20, f_height=engine.screen_height - 8,
+            title="Dungeon Level 1", console=console,
+        )
+    return timed(render, repeat)
+
+
+def bench_render_messages(scenario: Scenario, repeat: int) -> Samples:
+    console = scenario.console
+    messages = scenario.engine.message_log.messages
+    return timed(lambda: MessageLog.render_messages(console, 21, 43, 58, 6, messages), repeat)
+
+
+def bench_save_as(scenario: Scenario, repeat: int) -> Samples:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sav")
+        return timed(lambda: scenario.engine.save_as(path), max(1, repeat // 10))
+
+
+def bench_load_game(scenario: Scenario, repeat: int) -> Samples:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sav")
+        scenario.engine.save_as(path)
+        return timed(lambda: setup_game.load_game(path), max(1, repeat // 10))
+
+
+BENCHMARKS: Dict[str, Callable[[Scenario, int], Samples]] = {
+    "generate_dungeon": bench_generate_dungeon,
+    "update_fov": bench_update_fov,
+    "get_path_to": bench_get_path_to,
+    "handle_enemy_turns": bench_handle_enemy_turns,
+    "render_in_frame": bench_render_in_frame,
+    "render_messages": bench_render_messages,
+    "save_as": bench_save_as,
+    "load_game": bench_load_game,
+}
+
+
+def summarize(samples: Samples) -> Dict[str, float]:
+    return {
+        "samples": len(samples),
+        "median_ms": round(statistics.median(samples) * 1e3, 4),
+        "min_ms": round(min(samples) * 1e3, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1e3, 4),
+    }
+
+
+def run(
+    sizes: Tuple[Tuple[int, int], ...], densities: Tuple[int, ...], names: List[str], repeat: int, seed: int
+) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for width, height in sizes:
+        for density in densities:
+            scenario = Scenario(width, height, density, seed)
+            for name in names:
+                samples = BENCHMARKS[name](scenario, repeat)
+                if samples:
+                    key = f"{name}/{scenario.key}"
+                    results[key] = summarize(samples)
+                    print(f"{key:>40}: {results[key]['median_ms']:10.4f} ms")
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[str]:
+    """Print how every result changed against 'baseline', and return the keys which regressed"""
+    regressions = []
+    print(f"\n{'benchmark':>40}  {'baseline':>10}  {'now':>10}  change")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]["median_ms"]
+        now = result["median_ms"]
+        ratio = now / before if before else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 - threshold:
+            flag = "faster"
+        print(f"{key:>40}  {before:10.4f}  {now:10.4f}  {ratio - 1:+7.1%} {flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="only the smallest size and density")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run only these paths")
+    parser.add_argument("--repeat", type=int, default=100, help="samples per path, slow paths take fewer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--compare", metavar="BASELINE", help="a results file written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    sizes = SIZES[:1] if args.quick else SIZES
+    densities = DENSITIES[:1] if args.quick else DENSITIES
+    names = args.only or list(BENCHMARKS)
+
+    results = run(sizes, densities, names, args.repeat, args.seed)
+    with open(args.out, "w") as f:
+        json.dump(
+            {
+                "meta": {
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "numpy": np.__version__,
+                    "tcod": tcod.__version__,
+                    "repeat": args.repeat,
+                    "seed": args.seed,
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
@@ -0,0 +1,121 @@
+"""A 2D boolean map layer packed eight cells to a byte"""
+from __future__ import annotations
+
+from typing import Any, Tuple
+
+import numpy as np # type: ignore
+
+
+def packed_shape(width: int, height: int) -> Tuple[int, int]:
+    """Return the shape of the byte array needed to pack a width by height mask"""
+    return width, (height + 7) // 8
+
+
+class BitMask:
+    """
+    A boolean layer such as 'visible' or 'explored', stored as bits instead of bytes
+
+    Cells are packed along the y axis, so bit (y % 8) of bits[x, y // 8] holds cell x, y
+    'bits' can be a dense uint8 array or a ChunkedArray, only region and cell indexing is used on it
+    Supports [x, y] and [x_slice, y_slice] like a bool array, regions are unpacked on demand
+    """
+
+    shared = False # True while a fork may still be reading a dense 'bits'
+
+    def __init__(self, width: int, height: int, bits: Any):
+        assert tuple(bits.shape) == packed_shape(width, height)
+        self.width = width
+        self.height = height
+        self.bits = bits
+
+    def fork(self) -> BitMask:
+        """Return a copy of this mask which shares its bits until either mask writes to them"""
+        if isinstance(self.bits, np.ndarray):
+            fork = BitMask(self.width, self.height, self.bits)
+            fork.shared = self.shared = True
+            return fork
+        # chunked storage does its own copy-on-write
+        return BitMask(self.width, self.height, self.bits.fork())
+
+    def _writable_bits(self) -> Any:
+        if self.shared:
+            self.bits = self.bits.copy(order="F")
+            self.shared = False
+        return self.bits
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.bits.nbytes)
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        array = self[0 : self.width, 0 : self.height]
+        return array if dtype is None else array.astype(dtype)
+
+    def _bounds(self, index: Tuple[slice, slice]) -> Tuple[slice, int, int]:
+        """Return the x slice and the clipped y1, y2 of a slice index"""
+        x_slice, y_slice = index
+        x1, x2, _ = x_slice.indices(self.width)
+        y1, y2, y_step = y_slice.indices(self.height)
+        if y_step != 1:
+            raise IndexError("BitMask only supports contiguous slices")
+        return slice(x1, max(x1, x2)), y1, max(y1, y2)
+
+    def _unpack(self, x_slice: slice, y1: int, y2: int) -> Tuple[np.ndarray, int]:
+        """Unpack the bytes covering y1 to y2, returning the bools and the y they start at"""
+        first_byte, last_byte = y1 // 8, (y2 + 7) // 8
+        packed = np.asarray(self.bits[x_slice, first_byte:last_byte])
+        return np.unpackbits(packed, axis=1, bitorder="little").view(bool), first_byte * 8
+
+    def __getitem__(self, index: Any) -> Any:
+        x, y = index
+        if isinstance(x, slice) and isinstance(y, slice):
+            x_slice, y1, y2 = self._bounds(index)
+            unpacked, start = self._unpack(x_slice, y1, y2)
+            return np.asfortranarray(unpacked[:, y1 - start : y2 - start])
+
+        if not (0 <= y < self.height):
+            raise IndexError(f"Index {(x, y)} is out of bounds for shape {self.shape}")
+        return bool((self.bits[x, y >> 3] >> (y & 7)) & 1)
+
+    def get_cells(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Return the bits of the cells at coordinate arrays 'xs', 'ys' as a bool array"""
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        if isinstance(self.bits, np.ndarray):
+            packed = self.bits[xs, ys >> 3]
+        else:
+            # chunked storage only supports cell and region indexing
+            packed = np.array([self.bits[x, y >> 3] for x, y in zip(xs.tolist(), ys.tolist())], dtype=np.uint8)
+        return ((packed >> (ys & 7)) & 1).astype(bool)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        x, y = index
+        if isinstance(x, slice) and isinstance(y, slice):
+            x_slice, y1, y2 = self._bounds(index)
+            if y2 <= y1 or x_slice.stop <= x_slice.start:
+                return
+            bits = self._writable_bits()
+            if np.ndim(value) == 0 and y1 % 8 == 0 and (y2 % 8 == 0 or y2 == self.height):
+                # whole bytes, no need to unpack
+                bits[x_slice, y1 // 8 : (y2 + 7) // 8] = 0xFF if value else 0x00
+                return
+            unpacked, start = self._unpack(x_slice, y1, y2)
+            unpacked[:, y1 - start : y2 - start] = value
+            bits[x_slice, start // 8 : (y2 + 7) // 8] = np.packbits(
+                unpacked, axis=1, bitorder="little"
+            )
+            return
+
+        if not (0 <= y < self.height):
+            raise IndexError(f"Index {(x, y)} is out of bounds for shape {self.shape}")
+        bits = self._writable_bits()
+        byte = int(bits[x, y >> 3])
+        if value:
+            byte |= 1 << (y & 7)
+        else:
+            byte &= ~(1 << (y & 7)) & 0xFF
+        bits[x, y >> 3] = byte
@@ -0,0 +1,253 @@
+"""A sparse 2D array made of fixed-size chunks, for maps too large to keep in memory"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+import numpy as np # type: ignore
+
+ChunkKey = Tuple[int, int]
+
+
+class ChunkedArray:
+    """
+    A 2D array split into square chunks which are only allocated when first written
+
+    Reading a chunk that was never written returns 'fill_value', so large unused areas cost nothing
+    If 'directory' is given then every chunk is an np.memmap file in a subdirectory of it
+    owned by this array, letting the OS page chunks in and out instead of holding the whole array in RAM
+    The subdirectory is deleted when the array is, and replaced chunk files as soon as they are replaced
+
+    Supports the indexing used on map layers:
+    [x, y] for a single cell, [x_slice, y_slice] for a dense copy of a region,
+    and a full-size boolean mask when writing
+
+    fork() makes a copy which shares chunks until one side writes to them
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, int],
+        dtype: Any,
+        fill_value: Any,
+        chunk_size: int = 64,
+        directory: Optional[str] = None,
+        name: str = "layer",
+    ):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.fill_value = fill_value
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.name = name
+        self.chunks: Dict[ChunkKey, np.ndarray] = {}
+        self.shared: Set[ChunkKey] = set() # chunks another array may still be reading
+        self.files_created = 0
+        self.files_directory: Optional[str] = None
+        if directory:
+            self._new_files_directory()
+
+    def _new_files_directory(self) -> None:
+        assert self.directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.files_directory = os.path.abspath(tempfile.mkdtemp(prefix=f"{self.name}_", dir=self.directory))
+        # removed once this array is garbage, or at exit
+        # forks still reading a chunk keep its mapping, which outlives the file on POSIX
+        weakref.finalize(self, shutil.rmtree, self.files_directory, ignore_errors=True)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # save the chunk contents, not the memmap handles
+        state["chunks"] = {key: np.array(chunk) for key, chunk in self.chunks.items()}
+        state["shared"] = set()
+        state["files_directory"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__dict__.setdefault("shared", set())
+        self.__dict__.setdefault("files_created", 0)
+        self.files_directory = None
+        if self.directory:
+            self._new_files_directory()
+            chunks, self.chunks = self.chunks, {}
+            for key, data in chunks.items():
+                self._allocate(key)[...] = data
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the chunks allocated so far"""
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        """Return the whole array as a dense ndarray, this allocates the full size"""
+        array = self[0 : self.shape[0], 0 : self.shape[1]]
+        return array if dtype is None else array.astype(dtype)
+
+    def _new_chunk(self, key: ChunkKey) -> np.ndarray:
+        chunk_shape = (self.chunk_size, self.chunk_size)
+        if not self.files_directory:
+            return np.empty(chunk_shape, dtype=self.dtype, order="F")
+        # every file gets a new name, an older file of the same chunk may still be mapped by a fork
+        path = os.path.join(
+            self.files_directory, f"{key[0]}_{key[1]}_{self.files_created}.dat"
+        )
+        self.files_created += 1
+        return np.memmap(path, dtype=self.dtype, mode="w+", shape=chunk_shape, order="F")
+
+    def _allocate(self, key: ChunkKey) -> np.ndarray:
+        """
+        Return the chunk for 'key' ready to be written to
+
+        Missing chunks are created filled with fill_value, shared chunks are copied first
+        """
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self._new_chunk(key)
+            chunk[...] = self.fill_value
+            self.chunks[key] = chunk
+        elif key in self.shared:
+            copied = self._new_chunk(key)
+            copied[...] = chunk
+            self.chunks[key] = copied
+            self.shared.discard(key)
+            self._remove_file(chunk)
+            chunk = copied
+        return chunk
+
+    def _remove_file(self, chunk: np.ndarray) -> None:
+        """Delete the file of a chunk this array no longer uses, forks keep reading their mapping of it"""
+        filename = getattr(chunk, "filename", None)
+        if filename and self.files_directory and os.path.dirname(filename) == self.files_directory:
+            try:
+                os.remove(filename)
+            except OSError: # still mapped on Windows, the directory is removed later
+                pass
+
+    def _region(self, index: Tuple[slice, slice]) -> Tuple[int, int, int, int]:
+        """Return the bounds x1, y1, x2, y2 of a slice index, clipped to the array"""
+        x_slice, y_slice = index
+        x1, x2, x_step = x_slice.indices(self.shape[0])
+        y1, y2, y_step = y_slice.indices(self.shape[1])
+        if x_step != 1 or y_step != 1:
+            raise IndexError("ChunkedArray only supports contiguous slices")
+        return x1, y1, max(x1, x2), max(y1, y2)
+
+    def _overlaps(
+        self, x1: int, y1: int, x2: int, y2: int
+    ) -> Iterator[Tuple[ChunkKey, Tuple[slice, slice], Tuple[slice, slice]]]:
+        """
+        Yield every chunk overlapping the region x1, y1, x2, y2
+
+        Each result is the chunk key, the overlap inside the chunk, and the overlap inside the region
+        """
+        size = self.chunk_size
+        for chunk_x in range(x1 // size, (x2 - 1) // size + 1):
+            for chunk_y in range(y1 // size, (y2 - 1) // size + 1):
+                left = max(x1, chunk_x * size)
+                right = min(x2, (chunk_x + 1) * size)
+                top = max(y1, chunk_y * size)
+                bottom = min(y2, (chunk_y + 1) * size)
+                yield (
+                    (chunk_x, chunk_y),
+                    (
+                        slice(left - chunk_x * size, right - chunk_x * size),
+                        slice(top - chunk_y * size, bottom - chunk_y * size),
+                    ),
+                    (slice(left - x1, right - x1), slice(top - y1, bottom - y1)),
+                )
+
+    def _cell(self, x: int, y: int) -> Tuple[ChunkKey, int, int]:
+        if not (0 <= x < self.shape[0] and 0 <= y < self.shape[1]):
+            raise IndexError(f"Index {(x, y)} is out of bounds for shape {self.shape}")
+        size = self.chunk_size
+        return (x // size, y // size), x % size, y % size
+
+    def __getitem__(self, index: Any) -> Any:
+        x, y = index
+        if isinstance(x, slice) and isinstance(y, slice):
+            x1, y1, x2, y2 = self._region(index)
+            out = np.full((x2 - x1, y2 - y1), self.fill_value, dtype=self.dtype, order="F")
+            if out.size:
+                for key, inside_chunk, inside_out in self._overlaps(x1, y1, x2, y2):
+                    chunk = self.chunks.get(key)
+                    if chunk is not None:
+                        out[inside_out] = chunk[inside_chunk]
+            return out
+
+        key, local_x, local_y = self._cell(x, y)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return self.dtype.type(self.fill_value)
+        return chunk[local_x, local_y]
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        if isinstance(index, np.ndarray):
+            self._set_masked(index, value)
+            return
+
+        x, y = index
+        if isinstance(x, slice) and isinstance(y, slice):
+            x1, y1, x2, y2 = self._region(index)
+            if x2 <= x1 or y2 <= y1:
+                return
+            value = np.broadcast_to(np.asarray(value, dtype=self.dtype), (x2 - x1, y2 - y1))
+            for key, inside_chunk, inside_value in self._overlaps(x1, y1, x2, y2):
+                if key not in self.chunks and np.all(value[inside_value] == self.fill_value):
+                    continue # writing the fill value to an empty chunk changes nothing
+                self._allocate(key)[inside_chunk] = value[inside_value]
+            return
+
+        key, local_x, local_y = self._cell(x, y)
+        if key not in self.chunks and value == self.fill_value:
+            return
+        self._allocate(key)[local_x, local_y] = value
+
+    def _set_masked(self, mask: np.ndarray, value: Any) -> None:
+        """Write 'value' where the full-size boolean 'mask' is True"""
+        if mask.shape != self.shape or mask.dtype != bool:
+            raise IndexError("ChunkedArray only supports full-size boolean masks")
+        value = np.broadcast_to(np.asarray(value, dtype=self.dtype), self.shape)
+        for key, inside_chunk, inside_mask in self._overlaps(0, 0, *self.shape):
+            chunk_mask = mask[inside_mask]
+            if chunk_mask.any():
+                self._allocate(key)[inside_chunk][chunk_mask] = value[inside_mask][chunk_mask]
+
+    def fork(self) -> ChunkedArray:
+        """
+        Return a copy of this array which shares its chunks until either array writes to them
+
+        The copy keeps its own chunks in memory, even if this array is memory-mapped
+        """
+        fork = ChunkedArray(
+            self.shape, self.dtype, self.fill_value, chunk_size=self.chunk_size, name=self.name
+        )
+        fork.chunks = dict(self.chunks)
+        fork.shared = set(self.chunks)
+        self.shared.update(self.chunks)
+        return fork
+
+    def map_chunks(self, lookup: np.ndarray, name: str) -> ChunkedArray:
+        """
+        Return a new ChunkedArray with the same layout where each cell is lookup[cell]
+
+        Only allocated chunks are converted, the fill value is converted once
+        """
+        out = ChunkedArray(
+            self.shape,
+            lookup.dtype,
+            lookup[self.fill_value],
+            chunk_size=self.chunk_size,
+            directory=self.directory,
+            name=name,
+        )
+        for key, chunk in self.chunks.items():
+            out._allocate(key)[...] = lookup[chunk]
+        return out
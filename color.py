@@ -12,6 +12,8 @@ descend = (0x9F, 0x3F, 0xFF)
 player_die = (0xFF, 0x30, 0x30)
 enemy_die = (0xFF, 0xA0, 0x30)
 
+target_area = (0x60, 0x10, 0x10)
+
 invalid = (0xFF, 0xFF, 0x00)
 impossible = (0x80, 0x80, 0x80)
 error = (0xFF, 0x40, 0x40)
@@ -7,16 +7,27 @@ import numpy as np # type: ignore
 import tcod
 
 from actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
+import perf_hud
+from slots import copy_slots
 
 if TYPE_CHECKING:
     from entity import Actor
 
 class BaseAI(Action):
+    __slots__ = ()
+
     entity: Actor
 
     def perform(self) -> None:
         raise NotImplementedError()
 
+    def clone(self, entity: Actor) -> BaseAI:
+        """Return a copy of this AI controlling 'entity'"""
+        clone = object.__new__(type(self))
+        copy_slots(self, clone, skip=("entity",))
+        clone.entity = entity
+        return clone
+
     def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
         """
         Compute and return a path to the target position
@@ -24,35 +35,55 @@ class BaseAI(Action):
         If there is no valid path then return an empty list
         """
 
+        perf_hud.stats.path_calls += 1
+
+        gamemap = self.entity.gamemap
+        # only search the area the map allows, which is the whole map unless it is chunked
+        window = gamemap.path_window(self.entity.x, self.entity.y, dest_x, dest_y)
+        origin_x, origin_y = window[0].start, window[1].start
+
         # copy the walkable array
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an entity blocks movement and cost isn't zero (blocking)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                """
-                Add to the cost of a blocked position
-                A lower number means more enemies will crowd behind each other in hallways
-                A higher number means enemies will take longer paths in order to surround the player
-                """
-                cost[entity.x, entity.y] += 10
+        cost = np.array(gamemap.walkable[window], dtype=np.int8)
+        width, height = cost.shape
+
+        # living actors are what blocks movement, find the ones inside the window
+        table = gamemap.actor_table
+        rows = table.live_rows()
+        xs = table.x[rows] - origin_x
+        ys = table.y[rows] - origin_y
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        xs, ys = xs[inside], ys[inside]
+
+        """
+        Add to the cost of a blocked position, unless the cost is zero (blocking)
+        A lower number means more enemies will crowd behind each other in hallways
+        A higher number means enemies will take longer paths in order to surround the player
+        """
+        cost[xs, ys] += np.where(cost[xs, ys] != 0, 10, 0).astype(np.int8)
 
         # create a graph from the cost array and pass that graph to a new pathfinder
         graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
         pathfinder = tcod.path.Pathfinder(graph)
 
-        pathfinder.add_root((self.entity.x, self.entity.y)) # start position
+        pathfinder.add_root((self.entity.x - origin_x, self.entity.y - origin_y)) # start position
 
         # compute the path to the destination and remove the staring point
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+        path: List[List[int]] = pathfinder.path_to((dest_x - origin_x, dest_y - origin_y))[1:].tolist()
 
-        # convert from List[List[int]] to List[Tuple[int, int]]
-        return [(index[0], index[1]) for index in path]
+        # convert from List[List[int]] to List[Tuple[int, int]] in map coordinates
+        return [(index[0] + origin_x, index[1] + origin_y) for index in path]
 
 class HostileEnemy(BaseAI):
+    __slots__ = ("path",)
+
     def __init__(self, entity: Actor):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = []
+
+    def clone(self, entity: Actor) -> HostileEnemy:
+        clone = HostileEnemy(entity)
+        clone.path = list(self.path)
+        return clone
         
     def perform(self) -> None:
         target = self.engine.player
@@ -80,6 +111,8 @@ class ConfusedEnemy(BaseAI):
     If an actor occupies a tile it randomly moves into, it will attack
     """
 
+    __slots__ = ("previous_ai", "turns_remaining")
+
     def __init__(
         self, entity: Actor, previous_ai: Optional[BaseAI], turns_remaining: int,
     ):
@@ -88,6 +121,10 @@ class ConfusedEnemy(BaseAI):
         self.previous_ai = previous_ai
         self.turns_remaining = turns_remaining
 
+    def clone(self, entity: Actor) -> BaseAI:
+        previous_ai = self.previous_ai.clone(entity) if self.previous_ai else None
+        return type(self)(entity, previous_ai, self.turns_remaining)
+
     def perform(self) -> None:
         # revert the AI back to the original state if the effect has timed out
         if self.turns_remaining <= 0:
@@ -122,6 +159,8 @@ class DeactivateEnemy(BaseAI):
     A deactivated enemy will not be able to do anything for a given number of turns
     """
 
+    __slots__ = ("previous_ai", "turns_remaining")
+
     def __init__(
         self, entity: Actor, previous_ai: Optional[BaseAI], turns_remaining: int,
     ):
@@ -130,6 +169,10 @@ class DeactivateEnemy(BaseAI):
         self.previous_ai = previous_ai
         self.turns_remaining = turns_remaining
 
+    def clone(self, entity: Actor) -> BaseAI:
+        previous_ai = self.previous_ai.clone(entity) if self.previous_ai else None
+        return type(self)(entity, previous_ai, self.turns_remaining)
+
     def perform(self) -> None:
         # revert the AI back to the original state if the effect has timed out
         if self.turns_remaining <= 0:
@@ -1,15 +1,34 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TypeVar, TYPE_CHECKING
+
+from slots import copy_slots, restore_slots
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
     from game_map import GameMap
 
+C = TypeVar("C", bound="BaseComponent")
+
 class BaseComponent:
+    __slots__ = ("parent",)
+
     parent: Entity # Owning entity instance
 
+    def __setstate__(self, state: object) -> None:
+        restore_slots(self, state)
+
+    def clone(self: C) -> C:
+        """
+        Return a shallow copy of this component without a parent
+
+        Components holding mutable state override this to copy that state
+        """
+        clone = object.__new__(type(self))
+        copy_slots(self, clone, skip=("parent",))
+        return clone
+
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
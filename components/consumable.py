@@ -8,16 +8,18 @@ import components.inventory
 import components.ai
 from components.base_component import BaseComponent
 from exceptions import Impossible
-from input_handlers import (
-    ActionOrHandler,
-    AreaRangedAttackHandler, 
-    SingleRangedAttackHandler,
-)
 
 if TYPE_CHECKING:
     from entity import Actor, Item
+    from input_handlers import (
+        ActionOrHandler,
+        AreaRangedAttackHandler,
+        SingleRangedAttackHandler,
+    )
 
 class Consumable(BaseComponent):
+    __slots__ = ()
+
     parent: Item
 
     def get_action(self, consumer: Actor) -> Optional[ActionOrHandler]:
@@ -40,10 +42,15 @@ class Consumable(BaseComponent):
             inventory.items.remove(entity)
 
 class ConfusionConsumable(Consumable):
+    __slots__ = ("number_of_turns",)
+
     def __init__(self, number_of_turns: int):
         self.number_of_turns = number_of_turns
 
     def get_action(self, consumer: Actor) -> SingleRangedAttackHandler:
+        # imported here, the handlers are only needed once an item is used
+        from input_handlers import SingleRangedAttackHandler
+
         self.engine.message_log.add_message(
             "Select a target", color.needs_target
         )
@@ -73,11 +80,15 @@ class ConfusionConsumable(Consumable):
         self.consume()
 
 class DeactivateConsumable(Consumable):
+    __slots__ = ("radius", "number_of_turns")
+
     def __init__(self, radius: int, number_of_turns: int):
         self.radius = radius
         self.number_of_turns = number_of_turns
 
     def get_action(self, consumer: Actor) -> AreaRangedAttackHandler:
+        from input_handlers import AreaRangedAttackHandler
+
         self.engine.message_log.add_message(
             "Select target area", color.needs_target
         )
@@ -93,23 +104,23 @@ class DeactivateConsumable(Consumable):
         if not self.engine.game_map.visible[target_xy]:
             raise Impossible("You cannot target an area that you cannot see")
 
-        targets_hit = False
-        for actor in self.engine.game_map.actors:
-            if actor.distance(*target_xy) <= self.radius:
-                self.engine.message_log.add_message(
-                    f"The {actor.name} is frozen in place, unable to move!",
-                    color.status_effect_applied,
-                )
-                actor.ai = components.ai.DeactivateEnemy(
-                    entity=actor, previous_ai=actor.ai, turns_remaining=self.number_of_turns,
-                )
-                targets_hit = True
-
-        if not targets_hit:
+        targets = self.engine.game_map.actors_within_radius(*target_xy, self.radius)
+        if not targets:
             raise Impossible("There are no targets in the radius")
+
+        for actor in targets:
+            self.engine.message_log.add_message(
+                f"The {actor.name} is frozen in place, unable to move!",
+                color.status_effect_applied,
+            )
+            actor.ai = components.ai.DeactivateEnemy(
+                entity=actor, previous_ai=actor.ai, turns_remaining=self.number_of_turns,
+            )
         self.consume()
 
 class HealingConsumable(Consumable):
+    __slots__ = ("amount",)
+
     def __init__(self, amount: int):
         self.amount = amount
 
@@ -127,11 +138,15 @@ class HealingConsumable(Consumable):
             raise Impossible(f"Your health is already full")
 
 class FireballDamageConsumable(Consumable):
+    __slots__ = ("damage", "radius")
+
     def __init__(self, damage: int, radius: int):
         self.damage = damage
         self.radius = radius
 
     def get_action(self, consumer: Actor) -> AreaRangedAttackHandler:
+        from input_handlers import AreaRangedAttackHandler
+
         self.engine.message_log.add_message(
             "Select a target location", color.needs_target,
         )
@@ -148,36 +163,36 @@ class FireballDamageConsumable(Consumable):
         if not self.engine.game_map.visible[target_xy]:
             raise Impossible("You cannot target an area that you cannot see")
 
-        targets_hit = False
-        for actor in self.engine.game_map.actors:
-            if actor.distance(*target_xy) <= self.radius:
-                self.engine.message_log.add_message(
-                    f"The {actor.name} is engulfed in flames, taking {self.damage} damage!"
-                )
-                actor.fighter.take_damage(self.damage)
-                targets_hit = True
+        table = self.engine.game_map.actor_table
+        rows = table.rows_within_radius(*target_xy, self.radius)
 
-        if not targets_hit:
+        if not len(rows):
             raise Impossible("There are no targets in the radius")
+
+        # looked up first, dying frees an actor's row
+        targets = [(row, table.actors[row]) for row in rows.tolist()]
+        # damage everyone in one go, then report each target and let it die if it dropped to 0 hp
+        dead = set(table.damage(rows, self.damage).tolist())
+        for row, target in targets:
+            self.engine.message_log.add_message(
+                f"The {target.name} is engulfed in flames, taking {self.damage} damage!"
+            )
+            if row in dead:
+                target.fighter.die()
         self.consume()
 
 class LightningDamageConsumable(Consumable):
+    __slots__ = ("damage", "maximum_range")
+
     def __init__(self, damage: int, maximum_range: int):
         self.damage = damage
         self.maximum_range = maximum_range
 
     def activate(self, action: actions.ItemAction) -> None:
         consumer = action.entity
-        target = None
-        closest_distance = self.maximum_range + 1.0
-
-        for actor in self.engine.game_map.actors:
-            if actor is not consumer and self.parent.gamemap.visible[actor.x, actor.y]:
-                distance = consumer.distance(actor.x, actor.y)
-
-                if distance < closest_distance:
-                    target = actor
-                    closest_distance = distance
+        target = self.engine.game_map.nearest_visible_actor(
+            consumer.x, consumer.y, self.maximum_range + 1.0, exclude=consumer
+        )
 
         if target:
             self.engine.message_log.add_message(
@@ -4,30 +4,90 @@ from typing import TYPE_CHECKING
 
 import color
 from components.base_component import BaseComponent
-from render_order import RenderOrder
+from slots import restore_slots, state_dict
 
 if TYPE_CHECKING:
     from entity import Actor
 
 class Fighter(BaseComponent):
+    """
+    Combat stats of an actor
+
+    hp, power and defense are stored in the parent's ActorTable row while it is on a map,
+    the underscored attributes only hold them while the parent is off the map
+    """
+
+    __slots__ = ("max_hp", "_hp", "_defense", "_power")
+
     parent: Actor
 
     def __init__(self, hp: int, defense: int, power: int):
         self.max_hp = hp
         self._hp = hp
-        self.defense = defense
-        self.power = power
+        self._defense = defense
+        self._power = power
+
+    def __setstate__(self, state: object) -> None:
+        state = state_dict(state)
+        for stat in ("power", "defense"):
+            if stat in state: # saved when the stats were plain attributes
+                state[f"_{stat}"] = state.pop(stat)
+        restore_slots(self, state)
+
+    def clone(self) -> Fighter:
+        # read through the properties, while on a map the table row is newer than the attributes
+        clone = Fighter(hp=self.max_hp, defense=self.defense, power=self.power)
+        clone._hp = self.hp
+        return clone
 
     @property
     def hp(self) -> int:
-        return self._hp
+        actor = self.parent
+        if actor.table is None:
+            return self._hp
+        return int(actor.table.hp[actor.row])
 
     @hp.setter
     def hp(self, value: int) -> None:
-        self._hp = max(0, min(value, self.max_hp))
-        if self._hp == 0 and self.parent.ai:
+        hp = max(0, min(value, self.max_hp))
+        actor = self.parent
+        if actor.table is None:
+            self._hp = hp
+        else:
+            actor.table.hp[actor.row] = hp
+        if hp == 0 and actor.ai:
             self.die()
 
+    @property
+    def power(self) -> int:
+        actor = self.parent
+        if actor.table is None:
+            return self._power
+        return int(actor.table.power[actor.row])
+
+    @power.setter
+    def power(self, value: int) -> None:
+        actor = self.parent
+        if actor.table is None:
+            self._power = value
+        else:
+            actor.table.power[actor.row] = value
+
+    @property
+    def defense(self) -> int:
+        actor = self.parent
+        if actor.table is None:
+            return self._defense
+        return int(actor.table.defense[actor.row])
+
+    @defense.setter
+    def defense(self, value: int) -> None:
+        actor = self.parent
+        if actor.table is None:
+            self._defense = value
+        else:
+            actor.table.defense[actor.row] = value
+
     def die(self) -> None:
         if self.engine.player is self.parent:
             death_message = "You died"
@@ -36,12 +96,18 @@ class Fighter(BaseComponent):
             death_message = f"The {self.parent.name} is dead!"
             death_message_color = color.enemy_die
 
-        self.parent.char = "%"
-        self.parent.color = (191, 0, 0)
-        self.parent.blocks_movement = False
         self.parent.ai = None
-        self.parent.name = f"remains of {self.parent.name}"
-        self.parent.render_order = RenderOrder.CORPSE
+        if self.parent.table is not None:
+            self.parent.table.alive[self.parent.row] = False
+
+        corpse = self.parent.kind.corpse()
+        if self.engine.player is self.parent:
+            self.parent.kind = corpse
+        else:
+            # monster remains become a decal, so they stop costing anything in entity scans
+            gamemap = self.parent.gamemap
+            gamemap.remove_entity(self.parent)
+            gamemap.add_decal(self.parent.x, self.parent.y, corpse.char, corpse.color, corpse.name)
 
         self.engine.message_log.add_message(death_message, death_message_color)
 
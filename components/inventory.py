@@ -8,12 +8,22 @@ if TYPE_CHECKING:
     from entity import Actor, Item
 
 class Inventory(BaseComponent):
+    __slots__ = ("capacity", "items")
+
     parent: Actor
 
     def __init__(self, capacity: int):
         self.capacity = capacity
         self.items: List[Item] = []
 
+    def clone(self) -> Inventory:
+        clone = Inventory(self.capacity)
+        for item in self.items:
+            copied = item.clone()
+            copied.parent = clone
+            clone.items.append(copied)
+        return clone
+
     def drop(self, item: Item) -> None:
         """
         Removes an item from the inventory and restores it to the game map at the player's coordinates
@@ -8,6 +8,8 @@ if TYPE_CHECKING:
     from entity import Actor
 
 class Level(BaseComponent):
+    __slots__ = ("current_level", "current_xp", "level_up_base", "level_up_factor", "xp_given")
+
     parent: Actor
 
     def __init__(
@@ -2,24 +2,35 @@ from __future__ import annotations
 
 import lzma
 import pickle
-from typing import TYPE_CHECKING
+import random
+import time
+from typing import Any, Dict, Optional, TYPE_CHECKING
 
 from tcod.console import Console
 from tcod.map import compute_fov
 
 import exceptions
 from message_log import MessageLog
+import perf_hud
 import render_functions
+import timing
 
 
 if TYPE_CHECKING:
     from entity import Actor
     from game_map import GameMap, GameWorld
+    from journal import Journal
 
 class Engine:
     game_map: GameMap
     game_world: GameWorld
 
+    fov_radius = 8
+
+    # set by setup_game.new_game, None for games saved before they were recorded
+    seed: Optional[int] = None
+    journal: Optional[Journal] = None
+
     def __init__(self, player: Actor):
         self.message_log = MessageLog()
         self.cursor_location = (0, 0)
@@ -27,26 +38,71 @@ class Engine:
         self.screen_width = 80
         self.screen_height= 50
 
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # a recorded game replays from its seed, so a loaded game has to carry on from the same random state
+        state["random_state"] = random.getstate()
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.game_map.attach_actors()
+
+    def fork(self) -> Engine:
+        """
+        Return an independent copy of the game for AI lookahead or what-if previews
+
+        The copy is cheap: map layers are shared copy-on-write and only entity state is cloned,
+        so actions performed on the fork never touch this engine
+        There is no undo, to roll back just drop the fork and keep using this engine
+        """
+        fork = object.__new__(Engine)
+        fork.__dict__.update(self.__dict__)
+        fork.message_log = self.message_log.fork()
+        fork.journal = None # what happens in a fork isn't part of the player's session
+        fork.player = self.player.clone()
+        fork.game_world = self.game_world.fork(fork)
+        fork.game_map = self.game_map.fork(fork)
+        return fork
+
+    @timing.timed("engine.handle_enemy_turns")
     def handle_enemy_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
+        # actor table order, so replays of a session play out the same way
+        for entity in list(self.game_map.actors):
+            if entity is not self.player and entity.ai:
                 try:
-                    entity.ai.perform()
+                    with timing.span("ai", type(entity.ai).__name__):
+                        entity.ai.perform()
                 except exceptions.Impossible:
                     pass # ignore impossible action exceptions from AI
 
+    @timing.timed("engine.update_fov")
     def update_fov(self) -> None:
         """
         Recompute the visible area based on player's field of view
+
+        Only the window within the FOV radius of the player can be visible,
+        so FOV is computed over that window rather than the whole map
         """
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=8
+        start = time.perf_counter()
+        game_map = self.game_map
+        # clear what was visible last time
+        game_map.visible[game_map.fov_window] = False
+
+        window = game_map.window(self.player.x, self.player.y, self.fov_radius)
+        x_slice, y_slice = window
+        fov = compute_fov(
+            game_map.transparent[window],
+            (self.player.x - x_slice.start, self.player.y - y_slice.start),
+            radius=self.fov_radius,
         )
+        game_map.visible[window] = fov
         # if a tile is "visible" it should be added to "explored"
-        self.game_map.explored |= self.game_map.visible
+        game_map.explored[window] |= fov
+        game_map.fov_window = window
+        perf_hud.stats.fov_seconds = time.perf_counter() - start
 
+    @timing.timed("engine.render")
     def render(self, console: Console) -> None:
         #self.game_map.render(console)
 
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-import copy
 import math
 
 from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union
 
 from render_order import RenderOrder
+from slots import restore_slots, state_dict
 
 if TYPE_CHECKING:
+    from actor_table import ActorTable
     from components.ai import BaseAI
     from components.consumable import Consumable
     from components.fighter import Fighter
@@ -17,11 +18,58 @@ if TYPE_CHECKING:
 
 T = TypeVar("T", bound="Entity")
 
+class EntityKind:
+    """
+    The look and behaviour shared by every entity spawned from the same prototype
+
+    A kind is never changed once made, an entity which needs a different value
+    switches to a different kind instead
+    """
+
+    __slots__ = ("char", "color", "name", "blocks_movement", "render_order", "_corpse")
+
+    fields = ("char", "color", "name", "blocks_movement", "render_order")
+
+    def __init__(
+        self,
+        char: str,
+        color: Tuple[int, int, int],
+        name: str,
+        blocks_movement: bool,
+        render_order: RenderOrder,
+    ):
+        self.char = char
+        self.color = color
+        self.name = name
+        self.blocks_movement = blocks_movement
+        self.render_order = render_order
+        self._corpse: Optional[EntityKind] = None
+
+    def replace(self, **changes: object) -> EntityKind:
+        """Return a new kind with some fields changed"""
+        fields = {field: getattr(self, field) for field in self.fields}
+        fields.update(changes)
+        return EntityKind(**fields) # type: ignore
+
+    def corpse(self) -> EntityKind:
+        """Return the kind for the remains of this kind, shared by all of its corpses"""
+        if self._corpse is None:
+            self._corpse = self.replace(
+                char="%",
+                color=(191, 0, 0),
+                name=f"remains of {self.name}",
+                blocks_movement=False,
+                render_order=RenderOrder.CORPSE,
+            )
+        return self._corpse
+
 class Entity:
     """
     A generic object to represent players, enemies, items, etc
     """
 
+    __slots__ = ("parent", "_x", "_y", "kind")
+
     parent: Union[GameMap, Inventory]
 
     def __init__(
@@ -37,27 +85,101 @@ class Entity:
     ):
         self.x = x
         self.y = y
-        self.char = char
-        self.color = color
-        self.name = name
-        self.blocks_movement = blocks_movement
-        self.render_order = render_order
+        self.kind = EntityKind(char, color, name, blocks_movement, render_order)
         if parent:
             # if parent isn't provided now it will be set later
             self.parent = parent
-            parent.entities.add(self)
+            parent.add_entity(self)
+
+    def __setstate__(self, state: object) -> None:
+        state = state_dict(state)
+        if "kind" not in state:
+            # saved before entities shared their fields through a kind
+            state["kind"] = EntityKind(*(state.pop(field) for field in EntityKind.fields))
+        for axis in ("x", "y"):
+            if axis in state: # saved when the position was a plain attribute
+                state[f"_{axis}"] = state.pop(axis)
+        restore_slots(self, state)
+
+    @property
+    def char(self) -> str:
+        return self.kind.char
+
+    @char.setter
+    def char(self, value: str) -> None:
+        self.kind = self.kind.replace(char=value)
+
+    @property
+    def color(self) -> Tuple[int, int, int]:
+        return self.kind.color
+
+    @color.setter
+    def color(self, value: Tuple[int, int, int]) -> None:
+        self.kind = self.kind.replace(color=value)
+
+    @property
+    def name(self) -> str:
+        return self.kind.name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self.kind = self.kind.replace(name=value)
+
+    @property
+    def blocks_movement(self) -> bool:
+        return self.kind.blocks_movement
+
+    @blocks_movement.setter
+    def blocks_movement(self, value: bool) -> None:
+        self.kind = self.kind.replace(blocks_movement=value)
+
+    @property
+    def render_order(self) -> RenderOrder:
+        return self.kind.render_order
+
+    @render_order.setter
+    def render_order(self, value: RenderOrder) -> None:
+        self.kind = self.kind.replace(render_order=value)
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    @x.setter
+    def x(self, value: int) -> None:
+        self._x = value
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    @y.setter
+    def y(self, value: int) -> None:
+        self._y = value
 
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
 
+    def clone(self: T) -> T:
+        """
+        Return a new entity of the same kind at the same position, not placed on any map
+
+        The kind is shared, only per-instance state is copied
+        """
+        clone = object.__new__(type(self))
+        clone.kind = self.kind
+        clone._x = self.x
+        clone._y = self.y
+        return clone
+
     def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
         """Spawn a copy of thi instance at the given location"""
-        clone = copy.deepcopy(self)
+        clone = self.clone()
         clone.x = x
         clone.y = y
         clone.parent = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
         return clone
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
@@ -67,9 +189,9 @@ class Entity:
         if gamemap:
             if hasattr(self, "parent"): # possibly uninitialized
                 if self.parent is self.gamemap:
-                    self.gamemap.entities.remove(self)
+                    self.gamemap.remove_entity(self)
             self.parent = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
 
     def distance(self, x: int, y: int) -> float:
         """Return the distance between the current entity and the given (x, y) coordinate"""
@@ -81,6 +203,18 @@ class Entity:
         self.y += dy
 
 class Actor(Entity):
+    """
+    An entity which can act and fight
+
+    While on a GameMap the actor's position and fighter stats live in a row of
+    the map's ActorTable, this object and its Fighter read and write that row
+    Off the map (prototypes, or while changing maps) the state is kept on the objects
+    """
+
+    __slots__ = ("table", "row", "ai", "fighter", "inventory", "level")
+
+    table: Optional[ActorTable]
+
     def __init__(
         self,
         *,
@@ -94,6 +228,9 @@ class Actor(Entity):
         inventory: Inventory,
         level: Level,
     ):
+        self.table = None
+        self.row = 0
+
         super().__init__(
             x=x,
             y=y,
@@ -117,12 +254,86 @@ class Actor(Entity):
 
         
 
+    @property
+    def x(self) -> int:
+        table = self.table
+        if table is None:
+            return self._x
+        return int(table.x[self.row])
+
+    @x.setter
+    def x(self, value: int) -> None:
+        if self.table is None:
+            self._x = value
+        else:
+            self.table.x[self.row] = value
+
+    @property
+    def y(self) -> int:
+        table = self.table
+        if table is None:
+            return self._y
+        return int(table.y[self.row])
+
+    @y.setter
+    def y(self, value: int) -> None:
+        if self.table is None:
+            self._y = value
+        else:
+            self.table.y[self.row] = value
+
+    def __setstate__(self, state: object) -> None:
+        state = state_dict(state)
+        if "table" not in state:
+            # saved before actors had a row in an ActorTable, GameMap.attach_actors gives them one
+            state.update(table=None, row=0)
+        super().__setstate__(state)
+
     @property
     def is_alive(self) -> bool:
         """Returns True as long as this actor can perform actions"""
         return bool(self.ai)
 
+    def clone(self) -> Actor:
+        clone = super().clone()
+        clone.table = None
+        clone.row = 0
+
+        clone.ai = self.ai.clone(clone) if self.ai else None
+
+        clone.fighter = self.fighter.clone()
+        clone.fighter.parent = clone
+
+        clone.inventory = self.inventory.clone()
+        clone.inventory.parent = clone
+
+        clone.level = self.level.clone()
+        clone.level.parent = clone
+        return clone
+
+    def attach(self, table: ActorTable) -> None:
+        """Move this actor's state into a new row of 'table'"""
+        if self.table is not None:
+            self.detach()
+        self.row = table.add(self)
+        self.table = table
+
+    def detach(self) -> None:
+        """Copy this actor's state out of its table and free its row"""
+        table, row = self.table, self.row
+        if table is None:
+            return
+        self._x = int(table.x[row])
+        self._y = int(table.y[row])
+        self.fighter._hp = int(table.hp[row])
+        self.fighter._power = int(table.power[row])
+        self.fighter._defense = int(table.defense[row])
+        self.table = None
+        table.remove(row)
+
 class Item(Entity):
+    __slots__ = ("consumable",)
+
     def __init__(
         self,
         *,
@@ -146,3 +357,9 @@ class Item(Entity):
         self.consumable = consumable
         self.consumable.parent = self
 
+    def clone(self) -> Item:
+        clone = super().clone()
+        clone.consumable = self.consumable.clone()
+        clone.consumable.parent = clone
+        return clone
+
@@ -1,33 +1,83 @@
 from __future__ import annotations
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+import copy
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
 
 import numpy as np
-from tcod import heightmap_add # type: ignore
 from tcod.console import Console
 
+from actor_table import ActorTable
+from bitmask import BitMask, packed_shape
+from chunked_array import ChunkedArray
 from entity import Actor, Item
+import memory_report
 import tile_types
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
 
+# A per-tile map layer, either a dense array or a ChunkedArray for very large maps
+# Code which must work with both only indexes layers with [x, y] or [x_slice, y_slice]
+MapLayer = Union[np.ndarray, ChunkedArray]
+
+# Decals are remains drawn with the map rather than kept as entities
+# the decals layer holds an index into GameMap.decal_table and decal_names, 0 means no decal
+decal_id_dt = np.dtype(np.uint16)
+decal_dt = np.dtype([("ch", np.int32), ("fg", "3B")])
+
+DecalKey = Tuple[str, Tuple[int, int, int], str]
+
 class GameMap:
+    # per-tile layers shared copy-on-write with forks, written only through set_tiles and add_decal
+    shared_layers = ("tiles", "walkable", "transparent", "decals")
+
+    # dense storage, for maps saved before chunked storage existed
+    chunk_size: Optional[int] = None
+    chunk_directory: Optional[str] = None
+
     def __init__(
         self, 
         engine: Engine,
         width: int, 
         height: int, 
-        entities: Iterable[Entity] = ()
+        entities: Iterable[Entity] = (),
+        chunk_size: Optional[int] = None,
+        chunk_directory: Optional[str] = None,
     ):
+        """
+        If 'chunk_size' is given then the map layers are ChunkedArrays which allocate chunks lazily,
+        and with 'chunk_directory' those chunks are memory-mapped files in that directory
+        """
         self.engine = engine
         self.width, self.height = width, height
-        self.entities = set(entities)
-        self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
-
-        self.visible = np.full((width,height), fill_value=False, order="F") # Tiles player can see
-        self.explored = np.full((width,height), fill_value=False, order="F") # Tiles player has seen before
+        # used as an ordered set, so iterating entities is the same from run to run
+        self.entities: Dict[Entity, None] = {}
+        self.actor_table = ActorTable()
+        for entity in entities:
+            self.add_entity(entity)
+
+        self.chunk_size = chunk_size
+        self.chunk_directory = chunk_directory
+
+        # tile IDs, the properties of each tile are looked up in tile_types.tile_table
+        self.tiles = self._new_layer("tiles", tile_types.tile_id_dt, tile_types.wall)
+        # contiguous copies of the tile properties read by movement, pathfinding and FOV
+        # these are kept in sync by set_tiles
+        # with them a cell costs 3 bytes in memory, about 7x less than the old 22 byte tile records,
+        # saves only hold the 1 byte IDs as the masks are rebuilt on load
+        self.walkable: MapLayer
+        self.transparent: MapLayer
+        self.refresh_masks()
+
+        self._new_decals()
+
+        # bit-packed, eight tiles per byte, unpacked a region at a time when read
+        self.visible = self._new_bitmask("visible") # Tiles player can see
+        self.explored = self._new_bitmask("explored") # Tiles player has seen before
+        self.fov_window = (slice(0, 0), slice(0, 0)) # the area the last FOV was computed over
+        self.tiles_shared = False # True while a fork may still be reading dense tile layers
 
         self.downstairs_location = (0, 0)
 
@@ -42,34 +92,271 @@ class GameMap:
 
         self.name = "<no_name>"
 
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # the masks are derived from tiles, so rebuild them on load instead of saving them
+        del state["walkable"]
+        del state["transparent"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if isinstance(self.entities, set): # saved before entities were ordered
+            self.entities = dict.fromkeys(self.entities)
+        if "actor_table" not in state: # saved before actors were stored in a table
+            self.actor_table = ActorTable()
+        if self.tiles.dtype.names: # saved before maps held tile IDs, as whole tile records
+            self.tiles = tile_types.tile_ids(self.tiles)
+        self.tiles_shared = False
+        self.refresh_masks()
+        for name in ("visible", "explored"):
+            layer = getattr(self, name)
+            if isinstance(layer, np.ndarray): # saved before these were bit-packed
+                mask = self._new_bitmask(name)
+                mask[0 : self.width, 0 : self.height] = layer
+                setattr(self, name, mask)
+        if "fov_window" not in state: # the next FOV update clears whatever was saved as visible
+            self.fov_window = (slice(0, self.width), slice(0, self.height))
+        if "decals" not in state:
+            self._new_decals()
+
+    def fork(self, engine: Engine) -> GameMap:
+        """
+        Return a copy of this map belonging to 'engine', for lookahead and what-if checks
+
+        Tile layers and the visible and explored masks are shared until either map writes to them,
+        dense layers are copied on the first write and chunked layers copy only the written chunks
+        Entities are cloned, except the player which is taken from 'engine'
+        """
+        fork = object.__new__(GameMap)
+        fork.__dict__.update(self.__dict__)
+        fork.engine = engine
+
+        for name in self.shared_layers:
+            layer = getattr(self, name)
+            if isinstance(layer, ChunkedArray):
+                setattr(fork, name, layer.fork())
+            else:
+                self.tiles_shared = fork.tiles_shared = True
+        fork.visible = self.visible.fork()
+        fork.explored = self.explored.fork()
+        fork.decal_names = self.decal_names.copy()
+        fork.decal_ids = self.decal_ids.copy()
+
+        fork.entities = {}
+        fork.actor_table = ActorTable(capacity=len(self.actor_table.actors))
+        for entity in self.entities:
+            clone = engine.player if entity is self.engine.player else entity.clone()
+            clone.parent = fork
+            fork.add_entity(clone)
+        return fork
+
+    def _unshare_tiles(self) -> None:
+        """Give this map its own copies of the dense tile layers it shares with a fork"""
+        for name in self.shared_layers:
+            layer = getattr(self, name)
+            if isinstance(layer, np.ndarray):
+                setattr(self, name, layer.copy(order="F"))
+        self.tiles_shared = False
+
+    def _new_layer(
+        self, name: str, dtype: Any, fill_value: Any, shape: Optional[Tuple[int, int]] = None
+    ) -> MapLayer:
+        """Return a new map-sized layer using this map's storage backend"""
+        if shape is None:
+            shape = self.width, self.height
+        if self.chunk_size is None:
+            return np.full(shape, fill_value, dtype=dtype, order="F")
+        return ChunkedArray(
+            shape,
+            dtype,
+            fill_value,
+            chunk_size=self.chunk_size,
+            directory=self.chunk_directory,
+            name=name,
+        )
+
     @property
     def gamemap(self) -> GameMap:
         return self
 
+    def set_tiles(self, index: Any, tile_id: Any) -> None:
+        """
+        Write tile IDs to the map at 'index'
+
+        All tile writes should go through here so the walkable and transparent masks stay current
+        """
+        if self.tiles_shared:
+            self._unshare_tiles()
+        self.tiles[index] = tile_id
+        self.walkable[index] = tile_types.tile_table["walkable"][tile_id]
+        self.transparent[index] = tile_types.tile_table["transparent"][tile_id]
+
+    def _new_decals(self) -> None:
+        self.decals = self._new_layer("decals", decal_id_dt, 0)
+        self.decal_table = np.zeros(1, dtype=decal_dt)
+        self.decal_names: List[str] = [""]
+        self.decal_ids: Dict[DecalKey, int] = {}
+
+    def add_decal(self, x: int, y: int, char: str, color: Tuple[int, int, int], name: str) -> None:
+        """
+        Leave remains at x, y which are drawn with the map when visible
+
+        If the tile already has a decal the new glyph is shown and the names are combined
+        """
+        existing = int(self.decals[x, y])
+        if existing:
+            names = self.decal_names[existing]
+            if name not in names.split(", "):
+                names = f"{names}, {name}"
+            name = names
+
+        key = (char, color, name)
+        decal_id = self.decal_ids.get(key)
+        if decal_id is None:
+            decal_id = self.decal_ids[key] = len(self.decal_names)
+            self.decal_names.append(name)
+            # rebound rather than resized in place, a fork may share the old table
+            self.decal_table = np.append(
+                self.decal_table, np.array([(ord(char), color)], dtype=decal_dt)
+            )
+
+        if self.tiles_shared:
+            self._unshare_tiles()
+        self.decals[x, y] = decal_id
+
+    def get_decal_name(self, x: int, y: int) -> str:
+        """Return the names of the remains at x, y, or an empty string"""
+        return self.decal_names[int(self.decals[x, y])]
+
+    def _draw_decals(
+        self, console_tiles: np.ndarray, window: Tuple[slice, slice], visible: np.ndarray
+    ) -> None:
+        """Draw the visible decals of 'window' onto 'console_tiles', which covers the same area"""
+        decal_ids = self.decals[window]
+        shown = visible & (decal_ids != 0)
+        if shown.any():
+            decals = self.decal_table[decal_ids[shown]]
+            console_tiles["ch"][shown] = decals["ch"]
+            console_tiles["fg"][shown] = decals["fg"]
+
+    def _new_bitmask(self, name: str) -> BitMask:
+        """Return a new all-False bit-packed layer using this map's storage backend"""
+        bits = self._new_layer(name, np.uint8, 0, shape=packed_shape(self.width, self.height))
+        return BitMask(self.width, self.height, bits)
+
+    def refresh_masks(self) -> None:
+        """Rebuild the walkable and transparent masks from the whole tile array"""
+        for field in ("walkable", "transparent"):
+            lookup = tile_types.tile_table[field]
+            if isinstance(self.tiles, ChunkedArray):
+                mask = self.tiles.map_chunks(lookup, field)
+            else:
+                mask = np.asfortranarray(lookup[self.tiles])
+            setattr(self, field, mask)
+
+    def window(self, x: int, y: int, radius: int) -> Tuple[slice, slice]:
+        """Return the region within 'radius' tiles of x, y, clipped to the map"""
+        return (
+            slice(max(0, x - radius), min(self.width, x + radius + 1)),
+            slice(max(0, y - radius), min(self.height, y + radius + 1)),
+        )
+
+    def search_windows(self, x: int, y: int) -> Iterator[Tuple[slice, slice]]:
+        """
+        Yield ever larger regions around x, y to search for the nearest of something, the last is the whole map
+
+        Dense maps are searched whole straight away, chunked maps start with the chunks around x, y
+        and double the radius each time, so a search which finds something nearby loads only those chunks
+        """
+        if self.chunk_size is not None:
+            radius = self.chunk_size
+            while radius < max(self.width, self.height):
+                yield self.window(x, y, radius)
+                radius *= 2
+        yield slice(0, self.width), slice(0, self.height)
+
+    def path_window(self, x1: int, y1: int, x2: int, y2: int) -> Tuple[slice, slice]:
+        """
+        Return the region a path between two points is allowed to search
+
+        Dense maps search the whole map, chunked maps only search the chunks
+        around the two points plus a chunk of margin on every side
+        """
+        if self.chunk_size is None:
+            return slice(0, self.width), slice(0, self.height)
+        size = self.chunk_size
+        return (
+            slice(max(0, (min(x1, x2) // size - 1) * size), min(self.width, (max(x1, x2) // size + 2) * size)),
+            slice(max(0, (min(y1, y2) // size - 1) * size), min(self.height, (max(y1, y2) // size + 2) * size)),
+        )
+
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to this map, actors also get a row in the actor table"""
+        self.entities[entity] = None
+        if isinstance(entity, Actor):
+            entity.attach(self.actor_table)
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove an entity from this map, actors take their state with them"""
+        del self.entities[entity]
+        if isinstance(entity, Actor) and entity.table is self.actor_table:
+            entity.detach()
+
+    def attach_actors(self) -> None:
+        """
+        Give every actor on this map which has no row in the actor table one
+
+        Only actors loaded from saves made before the table existed lack a row,
+        this runs once they are all unpickled, as a map is unpickled before some of its actors
+        """
+        for entity in self.entities:
+            if isinstance(entity, Actor) and entity.table is None:
+                entity.attach(self.actor_table)
+
     @property
     def actors(self) -> Iterator[Actor]:
         """Iterate over this map's living actors"""
-        yield from (
-            entity 
-            for entity in self.entities
-            if isinstance(entity, Actor) and entity.is_alive
-        )
+        yield from self.actor_table.live_actors()
 
     @property
     def items(self) -> Iterator[Item]:
         yield from (entity for entity in self.entities if isinstance(entity, Item))
 
+    def actors_within_radius(self, x: int, y: int, radius: int) -> List[Actor]:
+        """Return the living actors within 'radius' of x, y, using the same disk as the targeting overlay"""
+        actors = self.actor_table.actors
+        return [actors[row] for row in self.actor_table.rows_within_radius(x, y, radius).tolist()] # type: ignore
+
+    def nearest_visible_actor(
+        self, x: int, y: int, max_distance: float, exclude: Optional[Actor] = None
+    ) -> Optional[Actor]:
+        """
+        Return the living actor on a visible tile closest to x, y and nearer than 'max_distance'
+
+        'exclude' is never returned, ties go to the actor that was added to the map first
+        """
+        table = self.actor_table
+        rows = table.live_rows()
+        if exclude is not None and exclude.table is table:
+            rows = rows[rows != exclude.row]
+        rows = rows[self.visible.get_cells(table.x[rows], table.y[rows])]
+        if not len(rows):
+            return None
+        distances = table.distances_squared(rows, x, y)
+        nearest = int(np.argmin(distances))
+        if distances[nearest] >= max_distance * max_distance:
+            return None
+        return table.actors[rows[nearest]]
+
     def get_blocking_entity_at_location(self, location_x: int, location_y: int) -> Optional[Entity]:
-        for entity in self.entities:
-            if entity.blocks_movement and entity.x == location_x and entity.y == location_y:
-                return entity
-            
-        return None
+        """Living actors are the only entities which block movement"""
+        return self.get_actor_at_location(location_x, location_y)
 
     def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        rows = self.actor_table.rows_at(x, y)
+        if len(rows):
+            return self.actor_table.actors[rows[0]]
             
         return None
 
@@ -86,11 +373,15 @@ class GameMap:
         If it isn't, but it is in the "explored" array, then use 'dark' color
         Otherwise, default is 'SHROUD'
         """
-        console.tiles_rgb[0:self.width, 0:self.height] = np.select(
-            condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
+        whole_map = slice(0, self.width), slice(0, self.height)
+        tiles = tile_types.tile_table[self.tiles[whole_map]]
+        visible = self.visible[whole_map]
+        console.tiles_rgb[whole_map] = np.select(
+            condlist=[visible, self.explored[whole_map]],
+            choicelist=[tiles["light"], tiles["dark"]],
             default=tile_types.SHROUD,
         )
+        self._draw_decals(console.tiles_rgb[whole_map], whole_map, visible)
 
         entities_sorted_for_rendering = sorted(
             self.entities, key=lambda x: x.render_order.value
@@ -164,15 +455,17 @@ class GameMap:
         slice_x = slice(x_origin, x_end -1)
         slice_y = slice(y_origin, y_end -1)
 
-        viewport_tiles = self.tiles[slice_x, slice_y]
+        viewport_tiles = tile_types.tile_table[self.tiles[slice_x, slice_y]]
         viewport_visible = self.visible[slice_x, slice_y]
         viewport_explored = self.explored[slice_x, slice_y]
 
-        console.tiles_rgb[x+1:x+v_width+1, y+1:y+v_height+1] = np.select(
+        console_viewport = console.tiles_rgb[x+1:x+v_width+1, y+1:y+v_height+1]
+        console_viewport[...] = np.select(
             condlist=[viewport_visible, viewport_explored],
             choicelist=[viewport_tiles["light"], viewport_tiles["dark"]],
             default=tile_types.SHROUD,
         )
+        self._draw_decals(console_viewport, (slice_x, slice_y), viewport_visible)
 
 
         entities_sorted_for_rendering = sorted(
@@ -192,6 +485,10 @@ class GameWorld:
     Holds the settings for the GameMap, and generates new maps when moving down
     """
 
+    # dense storage, for worlds saved before chunked storage existed
+    chunk_size: Optional[int] = None
+    chunk_directory: Optional[str] = None
+
     def __init__(
         self,
         *,
@@ -204,7 +501,13 @@ class GameWorld:
         max_monsters_per_room: int,
         max_items_per_room: int,
         current_floor: int = 0,
+        chunk_size: Optional[int] = None,
+        chunk_directory: Optional[str] = None,
     ):
+        """
+        'chunk_size' switches maps to chunked storage, see GameMap
+        With 'chunk_directory' each floor's chunks are memory-mapped into a subdirectory of it
+        """
         self.engine = engine
 
         self.map_width = map_width
@@ -220,11 +523,26 @@ class GameWorld:
 
         self.current_floor = current_floor
 
+        self.chunk_size = chunk_size
+        self.chunk_directory = chunk_directory
+
+    def fork(self, engine: Engine) -> GameWorld:
+        """Return a copy of these settings for a forked 'engine'"""
+        fork = copy.copy(self)
+        fork.engine = engine
+        # floors generated inside a fork stay in memory rather than reusing this world's files
+        fork.chunk_directory = None
+        return fork
+
     def generate_floor(self) -> None:
         from procgen import generate_dungeon
 
         self.current_floor += 1
 
+        chunk_directory = None
+        if self.chunk_directory:
+            chunk_directory = os.path.join(self.chunk_directory, f"floor_{self.current_floor}")
+
         self.engine.game_map = generate_dungeon(
             max_rooms=self.max_rooms,
             room_min_size=self.room_min_size,
@@ -234,4 +552,8 @@ class GameWorld:
             max_monsters_per_room=self.max_monsters_per_room,
             max_items_per_room=self.max_items_per_room,
             engine=self.engine,
-        )
\ No newline at end of file
+            floor_number=self.current_floor,
+            chunk_size=self.chunk_size,
+            chunk_directory=chunk_directory,
+        )
+        memory_report.floor_generated(self.current_floor)
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""
+Run games without a window, with a bot choosing the player's actions
+
+Games run as fast as the engine allows, so this is both the throughput benchmark and a soak test
+
+    python headless.py [--games N] [--seed N] [--policy explore|random|module:Class]
+                       [--max-turns N] [--render-every N] [--json FILE] [--timing FILE]
+                       [--memory FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import importlib
+import json
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np # type: ignore
+
+import quiet_warnings # noqa: F401, before the game's modules
+import tcod
+
+from actions import (
+    Action,
+    BumpAction,
+    ItemAction,
+    PickupAction,
+    TakeStairsAction,
+    WaitAction,
+)
+from auto_commands import ExploreCommand, distance_map, step_downhill
+from components.consumable import (
+    ConfusionConsumable,
+    DeactivateConsumable,
+    FireballDamageConsumable,
+    HealingConsumable,
+    LightningDamageConsumable,
+)
+from engine import Engine
+from exceptions import Impossible
+import memory_report
+import setup_game
+import timing
+
+SUBSYSTEMS = ("policy", "action", "generate_floor", "enemy_turns", "fov", "render")
+
+
+class BotPolicy:
+    """Chooses the player's action every turn, subclass this to plug in a different bot"""
+
+    def choose_action(self, engine: Engine) -> Action:
+        raise NotImplementedError()
+
+    def level_up(self, engine: Engine) -> None:
+        """Spend a pending level up, by default on a random attribute"""
+        level = engine.player.level
+        random.choice((level.increase_max_hp, level.increase_power, level.increase_defense))()
+
+
+class RandomBot(BotPolicy):
+    """Bumps in random directions, picks up whatever it stands on and takes any stairs it finds"""
+
+    def choose_action(self, engine: Engine) -> Action:
+        player = engine.player
+        if (player.x, player.y) == engine.game_map.downstairs_location:
+            return TakeStairsAction(player)
+        if random.random() < 0.1:
+            return PickupAction(player)
+        return BumpAction(player, random.randint(-1, 1), random.randint(-1, 1))
+
+
+class ExploreBot(BotPolicy):
+    """
+    Plays like a cautious player: heal when hurt, fight what it sees using items at range,
+    pick up items, explore the whole floor and then take the stairs
+    """
+
+    def __init__(self) -> None:
+        self.explorer: Optional[ExploreCommand] = None
+
+    def choose_action(self, engine: Engine) -> Action:
+        player = engine.player
+        game_map = engine.game_map
+        fighter = player.fighter
+
+        if fighter.hp <= fighter.max_hp // 2:
+            healing = self.find_item(engine, HealingConsumable)
+            if healing:
+                return ItemAction(player, healing)
+
+        enemy = game_map.nearest_visible_actor(player.x, player.y, math.inf, exclude=player)
+        if enemy:
+            return self.fight(engine, enemy)
+
+        inventory = player.inventory
+        if len(inventory.items) < inventory.capacity:
+            items = [item for item in game_map.items if game_map.visible[item.x, item.y]]
+            if any(item.x == player.x and item.y == player.y for item in items):
+                return PickupAction(player)
+            step = self.step_towards(engine, [(item.x, item.y) for item in items])
+            if step:
+                return step
+
+        if self.explorer is None or self.explorer.engine is not engine:
+            self.explorer = ExploreCommand(engine)
+        try:
+            action = self.explorer.next_action()
+            if action:
+                return action
+        except Impossible:
+            pass # the floor is explored, head for the stairs
+
+        if (player.x, player.y) == game_map.downstairs_location:
+            return TakeStairsAction(player)
+        return self.step_towards(engine, [game_map.downstairs_location]) or WaitAction(player)
+
+    def fight(self, engine: Engine, enemy: Any) -> Action:
+        player = engine.player
+        dx, dy = enemy.x - player.x, enemy.y - player.y
+        if max(abs(dx), abs(dy)) <= 1:
+            return BumpAction(player, dx, dy)
+
+        distance = math.hypot(dx, dy)
+        for item in player.inventory.items:
+            consumable = item.consumable
+            if isinstance(consumable, LightningDamageConsumable):
+                if distance < consumable.maximum_range + 1:
+                    return ItemAction(player, item)
+            elif isinstance(consumable, (FireballDamageConsumable, DeactivateConsumable)):
+                if distance > consumable.radius: # don't catch ourselves in the blast
+                    return ItemAction(player, item, (enemy.x, enemy.y))
+            elif isinstance(consumable, ConfusionConsumable):
+                return ItemAction(player, item, (enemy.x, enemy.y))
+
+        return self.step_towards(engine, [(enemy.x, enemy.y)]) or WaitAction(player)
+
+    def find_item(self, engine: Engine, consumable_type: Type[Any]) -> Optional[Any]:
+        for item in engine.player.inventory.items:
+            if isinstance(item.consumable, consumable_type):
+                return item
+        return None
+
+    def step_towards(self, engine: Engine, goals: List[Any]) -> Optional[Action]:
+        """Return a step along known tiles towards the nearest of 'goals', if one can be reached"""
+        if not goals:
+            return None
+        game_map = engine.game_map
+        player = engine.player
+        for x_slice, y_slice in game_map.search_windows(player.x, player.y):
+            inside = [(x, y) for x, y in goals if x_slice.start <= x < x_slice.stop and y_slice.start <= y < y_slice.stop]
+            if not inside:
+                continue
+            window = x_slice, y_slice
+            cost = np.asarray(game_map.walkable[window]) & np.asarray(game_map.explored[window])
+            goal_mask = np.zeros(cost.shape, dtype=bool)
+            for x, y in inside:
+                goal_mask[x - x_slice.start, y - y_slice.start] = True
+            distance = distance_map(cost.astype(np.int8), goal_mask)
+            direction = step_downhill(distance, player.x - x_slice.start, player.y - y_slice.start)
+            if direction is not None:
+                return BumpAction(player, *direction)
+        return None
+
+
+POLICIES: Dict[str, Type[BotPolicy]] = {
+    "explore": ExploreBot,
+    "random": RandomBot,
+}
+
+
+def load_policy(name: str) -> Type[BotPolicy]:
+    """Return a policy class by its name in POLICIES, or from a 'module:Class' path"""
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)
+    return POLICIES[name]
+
+
+def run_game(
+    policy: BotPolicy,
+    seed: int,
+    max_turns: int = 5000,
+    render_every: int = 0,
+) -> Dict[str, Any]:
+    """
+    Play one seeded game until the player dies or 'max_turns' have passed
+
+    Returns the outcome and the seconds spent in each of SUBSYSTEMS,
+    and the memory report of the finished game while memory_report is tracing
+    Turns follow EventHandler.handle_action, except an impossible action is replaced by waiting
+    """
+    timings = dict.fromkeys(SUBSYSTEMS, 0.0)
+    memory_report.clear_floors()
+    console = tcod.Console(80, 50, order="F") if render_every else None
+
+    start = time.perf_counter()
+    engine = setup_game.new_game(seed)
+    timings["generate_floor"] += time.perf_counter() - start
+
+    player = engine.player
+    turns = 0
+    impossible_actions = 0
+    damage_taken = 0
+    items_used: Dict[str, int] = collections.Counter()
+
+    while turns < max_turns and player.is_alive:
+        t0 = time.perf_counter()
+        action = policy.choose_action(engine)
+        t1 = time.perf_counter()
+
+        floor = engine.game_world.current_floor
+        try:
+            action.perform()
+            if isinstance(action, ItemAction):
+                items_used[action.item.name] += 1
+        except Impossible:
+            impossible_actions += 1
+            WaitAction(player).perform()
+        t2 = time.perf_counter()
+        timings["generate_floor" if engine.game_world.current_floor != floor else "action"] += t2 - t1
+
+        hp = player.fighter.hp
+        engine.handle_enemy_turns()
+        damage_taken += max(0, hp - player.fighter.hp)
+        t3 = time.perf_counter()
+
+        engine.update_fov()
+        t4 = time.perf_counter()
+
+        timings["policy"] += t1 - t0
+        timings["enemy_turns"] += t3 - t2
+        timings["fov"] += t4 - t3
+
+        if player.is_alive and player.level.requires_level_up:
+            policy.level_up(engine)
+
+        turns += 1
+        if console is not None and turns % render_every == 0:
+            t5 = time.perf_counter()
+            console.clear()
+            engine.render(console)
+            timings["render"] += time.perf_counter() - t5
+
+    result: Dict[str, Any] = {
+        "seed": seed,
+        "turns": turns,
+        "floor": engine.game_world.current_floor,
+        "died": not player.is_alive,
+        "level": player.level.current_level,
+        "damage_taken": damage_taken,
+        "impossible_actions": impossible_actions,
+        "items_used": dict(items_used),
+        "seconds": round(time.perf_counter() - start, 4),
+        "subsystem_seconds": {name: round(seconds, 4) for name, seconds in timings.items()},
+    }
+    if memory_report.is_tracing():
+        # taken before the engine is dropped, so the game's own memory is in the report
+        result["memory"] = memory_report.report(engine)
+    return result
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine game results into totals, throughput and the share of time per subsystem"""
+    turns = sum(result["turns"] for result in results)
+    seconds = sum(result["seconds"] for result in results)
+    subsystems = {
+        name: sum(result["subsystem_seconds"][name] for result in results) for name in SUBSYSTEMS
+    }
+    floors = [result["floor"] for result in results]
+    return {
+        "games": len(results),
+        "turns": turns,
+        "seconds": round(seconds, 3),
+        "turns_per_second": round(turns / seconds, 1) if seconds else 0.0,
+        "deaths": sum(result["died"] for result in results),
+        "mean_floor": round(sum(floors) / len(floors), 2) if floors else 0.0,
+        "max_floor": max(floors, default=0),
+        "subsystem_seconds": {name: round(value, 3) for name, value in subsystems.items()},
+        "subsystem_share": {
+            name: round(value / seconds, 3) if seconds else 0.0 for name, value in subsystems.items()
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, later games count up")
+    parser.add_argument("--policy", default="explore")
+    parser.add_argument("--max-turns", type=int, default=5000)
+    parser.add_argument("--render-every", type=int, default=0, help="render off-screen every N turns, 0 never renders")
+    parser.add_argument("--json", help="also write every result and the summary to this file")
+    parser.add_argument("--timing", metavar="FILE", help="record timing spans and export them to this file")
+    parser.add_argument("--memory", metavar="FILE", help="trace memory per subsystem and floor, and write a report of every game here")
+    args = parser.parse_args()
+
+    if args.timing:
+        timing.enable(args.timing)
+    if args.memory:
+        memory_report.start()
+
+    policy_class = load_policy(args.policy)
+    results = []
+    memory_reports = []
+    for seed in range(args.seed, args.seed + args.games):
+        result = run_game(policy_class(), seed, args.max_turns, args.render_every)
+        if "memory" in result:
+            memory_reports.append({"seed": seed, **result.pop("memory")})
+        results.append(result)
+        outcome = "died" if result["died"] else "alive"
+        print(
+            f"seed {seed}: {result['turns']} turns, floor {result['floor']}, {outcome}, "
+            f"{result['turns'] / result['seconds']:.0f} turns/s"
+        )
+
+    summary = summarize(results)
+    for key, value in summary.items():
+        print(f"{key:>20}: {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "games": results}, f, indent=2)
+    if args.memory:
+        with open(args.memory, "w") as f:
+            json.dump({"games": memory_reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
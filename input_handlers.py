@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import functools
 import os
 
-from typing import Callable, Optional, Tuple, TYPE_CHECKING, Union
+from typing import Callable, Hashable, Optional, Tuple, TYPE_CHECKING, Union
 
+import numpy as np # type: ignore
 import tcod
 
 import actions
@@ -11,12 +13,19 @@ import actions
 from actions import (
     Action, 
     BumpAction, 
+    LevelUpAction,
     WaitAction,
     PickupAction,
 )
 
+from auto_commands import AutoCommand, ExploreCommand, RestCommand, TravelCommand
 import color
 import exceptions
+import memory_report
+import perf_hud
+import slow_turns
+from stencils import disk_stencil
+import timing
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -54,14 +63,42 @@ CONFIRM_KEYS = {
     tcod.event.K_KP_ENTER,
 }
 
-ActionOrHandler = Union[Action, "BaseEventHandler"]
+ActionOrHandler = Union[Action, AutoCommand, "BaseEventHandler"]
 """An event handler return value which an trigger an action or switch active handlers
 
 If a handler is returned then it will become the active handler for future events.
 If an action is returned it will be attempted and if it's valid then
 MainGameEventHandler will become the active handler.
+An AutoCommand is performed like a series of actions, one per turn.
 """
 
+class Backdrop:
+    """
+    What a modal handler draws underneath itself, rendered once and copied into later frames
+
+    'render' draws it onto the console, and is only called again when the console size
+    or the value returned by 'key' changes
+    """
+
+    def __init__(
+        self,
+        render: Callable[[tcod.Console], None],
+        key: Callable[[], Hashable] = lambda: None,
+    ):
+        self.render = render
+        self.key = key
+        self.tiles: Optional[np.ndarray] = None
+        self.rendered_key: Hashable = None
+
+    def draw(self, console: tcod.Console) -> None:
+        key = (console.width, console.height, self.key())
+        if self.tiles is None or key != self.rendered_key:
+            self.render(console)
+            self.tiles = console.tiles_rgb.copy()
+            self.rendered_key = key
+        else:
+            console.tiles_rgb[...] = self.tiles
+
 class BaseEventHandler(tcod.event.EventDispatch[ActionOrHandler]):
     def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
         """Handle an event and return the next active event handler"""
@@ -83,13 +120,18 @@ class PopupMessage(BaseEventHandler):
     def __init__(self, parent_handler: BaseEventHandler, text: str):
         self.parent = parent_handler
         self.text = text
+        # the parent can't change while the popup is open
+        self.backdrop = Backdrop(self.render_dimmed_parent)
 
-    def on_render(self, console: tcod.Console) -> None:
-        """Render the parent and dim the result, then print the message on top"""
+    def render_dimmed_parent(self, console: tcod.Console) -> None:
         self.parent.on_render(console)
         console.tiles_rgb["fg"] //= 8
         console.tiles_rgb["bg"] //= 8
 
+    def on_render(self, console: tcod.Console) -> None:
+        """Render the parent and dim the result, then print the message on top"""
+        self.backdrop.draw(console)
+
         console.print(
             console.width // 2,
             console.height // 2,
@@ -108,12 +150,26 @@ class EventHandler(BaseEventHandler):
     def __init__(self, engine: Engine):
         self.engine = engine
 
+    @functools.cached_property
+    def backdrop(self) -> Backdrop:
+        """
+        The game drawn under a modal handler, made on first use, so handlers which don't draw it
+        such as MainGameEventHandler don't allocate one
+        A modal handler leaves the game unchanged while open, apart from new messages and the cursor
+        """
+        engine = self.engine
+        return Backdrop(engine.render, lambda: (engine.message_log.changes, engine.cursor_location))
+
     def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
         """Handle events for input handlers with an engine"""
         action_or_state = self.dispatch(event)
         if isinstance(action_or_state, BaseEventHandler):
             return action_or_state
-        if self.handle_action(action_or_state):
+        if isinstance(action_or_state, AutoCommand):
+            performed = self.handle_command(action_or_state)
+        else:
+            performed = self.handle_action(action_or_state)
+        if performed:
             # a valid action was performed
             if not self.engine.player.is_alive:
                 # the player was killed sometime during or after the action
@@ -131,20 +187,67 @@ class EventHandler(BaseEventHandler):
         if action is None:
             return False
 
-        try:
-            action.perform()
-        except exceptions.Impossible as exc:
-            self.engine.message_log.add_message(exc.args[0], color.impossible)
-            return False # skip enemy turn on exceptions
-
-        self.engine.handle_enemy_turns()
-
-        self.engine.update_fov()
+        journal = self.engine.journal
+        entry = journal.encode(action) if journal is not None else None
+        perf_hud.stats.begin_turn()
+        with slow_turns.turns.watch(self.engine, type(action).__name__):
+            try:
+                with timing.span("action", type(action).__name__):
+                    action.perform()
+            except exceptions.Impossible as exc:
+                self.engine.message_log.add_message(exc.args[0], color.impossible)
+                return False # skip enemy turn on exceptions
+            if journal is not None:
+                journal.record(entry)
+
+            self.engine.handle_enemy_turns()
+
+            self.engine.update_fov()
+        perf_hud.stats.end_turn()
         return True
 
+    def handle_command(self, command: AutoCommand) -> bool:
+        """
+        Perform the turns of a multi-turn command back to back, nothing is rendered in between
+        Returns True if at least one turn was taken
+        """
+        player = self.engine.player
+        while command.turns < command.max_turns:
+            interruption = command.interruption()
+            if interruption:
+                self.engine.message_log.add_message(interruption, color.impossible)
+                break
+            try:
+                action = command.next_action()
+            except exceptions.Impossible as exc:
+                self.engine.message_log.add_message(exc.args[0], color.impossible)
+                break
+            if action is None or not self.handle_action(action):
+                break
+            command.turns += 1
+            if not player.is_alive or player.level.requires_level_up:
+                break
+        return command.turns > 0
+
+    def get_map_location(self, tile: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """Convert a console tile to map coordinates, or None if it is outside the map viewport"""
+        game_map = self.engine.game_map
+        x, y = tile
+        if not (
+            game_map.viewport_x <= x < game_map.viewport_x + game_map.viewport_width
+            and game_map.viewport_y <= y < game_map.viewport_y + game_map.viewport_height
+        ):
+            return None
+        x -= game_map.x_offset
+        y -= game_map.y_offset
+        if not game_map.in_bounds(x, y):
+            return None
+        return x, y
+
     def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
-        if self.engine.game_map.in_bounds(event.tile.x, event.tile.y):
-            self.engine.cursor_location = event.tile.x, event.tile.y
+        location = self.get_map_location(event.tile)
+        if location:
+            self.engine.cursor_location = location
 
     def ev_quit(self, event: tcod.event.Quit) -> Optional[Action]:
         raise SystemExit()
@@ -182,7 +285,7 @@ class LevelUpEventHandler(AskUserEventHandler):
     TITLE = "Level Up"
 
     def on_render(self, console: tcod.Console) -> None:
-        super().on_render(console)
+        self.backdrop.draw(console)
 
         if self.engine.player.x <= 30:
             x = 40
@@ -225,12 +328,18 @@ class LevelUpEventHandler(AskUserEventHandler):
         index = key - tcod.event.K_a
 
         if 0 <= index <= 2:
-            if index == 0:
-                player.level.increase_max_hp()
-            elif index == 1:
-                player.level.increase_power()
+            # an action rather than a direct call so the choice is journaled
+            action = LevelUpAction(player, LevelUpAction.attributes[index])
+            journal = self.engine.journal
+            entry = journal.encode(action) if journal is not None else None
+            try:
+                action.perform()
+            except exceptions.Impossible as exc:
+                # nothing left to spend, so the menu closes without a journal entry
+                self.engine.message_log.add_message(exc.args[0], color.impossible)
             else:
-                player.level.increase_defense()
+                if journal is not None:
+                    journal.record(entry)
         else:
             self.engine.message_log.add_message("Invalid choice", color.invalid)
 
@@ -258,7 +367,7 @@ class InventoryEventHandler(AskUserEventHandler):
         and the letter to select them.
         Will move to a different position based on where the player is located,
         so the player can always see where they are"""
-        super().on_render(console)
+        self.backdrop.draw(console)
         number_of_items_in_inventory = len(self.engine.player.inventory.items)
 
         height = number_of_items_in_inventory + 2
@@ -393,9 +502,10 @@ class SelectIndexHandler(AskUserEventHandler):
 
     def ev_mousebuttondown(self, event: tcod.event.MouseButtonDown) -> Optional[ActionOrHandler]:
         """Left click confirms a selection"""
-        if self.engine.game_map.in_bounds(*event.tile):
+        location = self.get_map_location(event.tile)
+        if location:
             if event.button == 1:
-                return self.on_index_selected(*event.tile)
+                return self.on_index_selected(*location)
         return super().ev_mousebuttondown(event)
 
     def on_index_selected(self, x: int, y: int) -> Optional[ActionOrHandler]:
@@ -437,20 +547,24 @@ class AreaRangedAttackHandler(SelectIndexHandler):
         self.callback = callback
 
     def on_render(self, console: tcod.Console) -> None:
-        """Highlight the tile under the cursor"""
+        """Highlight the tile under the cursor and the area of effect around it"""
         super().on_render(console)
 
+        game_map = self.engine.game_map
         x, y = self.engine.cursor_location
 
-        # Draw a rectangle around the targeted area so the player can see the area of effect
-        #console.draw_frame(
-        #    x=x - self.radius - 1 + self.engine.game_map.x_offset,
-        #    y=y - self.radius - 1 + self.engine.game_map.y_offset,
-        #    width=self.radius ** 2,
-        #    height=self.radius ** 2,
-        #    fg=color.red,
-        #    clear=False,
-        #)
+        # the same disk the consumables use to find their targets, clipped to the viewport
+        stencil = disk_stencil(self.radius).copy()
+        stencil[self.radius, self.radius] = False # keep the cursor highlight
+        left = x - self.radius + game_map.x_offset
+        top = y - self.radius + game_map.y_offset
+        x1 = max(left, game_map.viewport_x)
+        y1 = max(top, game_map.viewport_y)
+        x2 = min(left + stencil.shape[0], game_map.viewport_x + game_map.viewport_width)
+        y2 = min(top + stencil.shape[1], game_map.viewport_y + game_map.viewport_height)
+        if x1 < x2 and y1 < y2:
+            area = stencil[x1 - left : x2 - left, y1 - top : y2 - top]
+            console.tiles_rgb["bg"][x1:x2, y1:y2][area] = color.target_area
 
     def on_index_selected(self, x: int, y: int) -> Optional[Action]:
         return self.callback((x,y))
@@ -510,10 +624,41 @@ class MainGameEventHandler(EventHandler):
         elif key == tcod.event.K_l:
             return LookHandler(self.engine)
 
+        # Performance overlay
+
+        elif key == tcod.event.K_F3:
+            perf_hud.toggle()
+
+        # Memory report, the first press starts tracing
+
+        elif key == tcod.event.K_F4:
+            if memory_report.is_tracing():
+                memory_report.write(memory_report.DEFAULT_PATH, self.engine)
+                message = f"Memory report written to {memory_report.DEFAULT_PATH}"
+            else:
+                memory_report.start()
+                message = "Memory tracing started, press F4 again to write a report"
+            self.engine.message_log.add_message(message, color.impossible)
+
+        # Multi-turn commands
+
+        elif key == tcod.event.K_o:
+            return ExploreCommand(self.engine)
+
+        elif key == tcod.event.K_r:
+            return RestCommand(self.engine)
+
         # No valid key pressed
 
         return action
 
+    def ev_mousebuttondown(self, event: tcod.event.MouseButtonDown) -> Optional[ActionOrHandler]:
+        """Left click on the map travels there"""
+        location = self.get_map_location(event.tile)
+        if location and event.button == 1:
+            return TravelCommand(self.engine, *location)
+        return None
+
 class GameOverEventHandler(EventHandler):
 
     def on_quit(self) -> None:
@@ -543,11 +688,16 @@ class HistoryViewer(EventHandler):
         super().__init__(engine)
         self.log_length = len(engine.message_log.messages)
         self.cursor = self.log_length -1
+        self.log_console: Optional[tcod.Console] = None
 
     def on_render(self, console: tcod.Console) -> None:
-        super().on_render(console) # draw the main state as the background
+        self.backdrop.draw(console) # draw the main state as the background
 
-        log_console = tcod.Console(console.width - 6, console.height - 6)
+        # kept between frames, only the messages shown change
+        log_console = self.log_console
+        if log_console is None or log_console.width != console.width - 6 or log_console.height != console.height - 6:
+            log_console = self.log_console = tcod.Console(console.width - 6, console.height - 6)
+        log_console.clear()
 
         # draw a frame with a custom banner title
         log_console.draw_frame(0, 0, log_console.width, log_console.height)
@@ -0,0 +1,92 @@
+"""Recording of the player's actions, so a session can be replayed exactly from its seed"""
+from __future__ import annotations
+
+import json
+from typing import Any, List, Optional, TYPE_CHECKING
+
+import actions
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+Entry = List[Any]
+
+JOURNAL_VERSION = 1
+
+
+def state_digest(engine: Engine) -> List[int]:
+    """Return a few numbers which a faithful replay must reproduce"""
+    player = engine.player
+    return [engine.game_world.current_floor, player.x, player.y, player.fighter.hp, player.level.current_xp]
+
+
+class Journal:
+    """
+    The seed of a game and every action the player performed in it, in order
+
+    Entries are short lists such as ["BumpAction", 1, 0] or ["ItemAction", 2, 10, 7],
+    items are stored as their inventory index, so a journal doesn't hold on to any entities
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.entries: List[Entry] = []
+        self.end_state: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def encode(action: actions.Action) -> Entry:
+        """Return the entry for 'action', this must be called before the action is performed"""
+        name = type(action).__name__
+        if isinstance(action, actions.ActionWithDirection):
+            return [name, action.dx, action.dy]
+        if isinstance(action, actions.ItemAction):
+            index = action.entity.inventory.items.index(action.item)
+            return [name, index, *action.target_xy]
+        if isinstance(action, actions.LevelUpAction):
+            return [name, action.attribute]
+        return [name]
+
+    @staticmethod
+    def decode(entry: Entry, engine: Engine) -> actions.Action:
+        """Return the action for 'entry', performed by the player of 'engine'"""
+        name, *args = entry
+        action_class = getattr(actions, name)
+        player = engine.player
+        if issubclass(action_class, actions.ItemAction):
+            index, x, y = args
+            return action_class(player, player.inventory.items[index], (x, y))
+        return action_class(player, *args)
+
+    def record(self, entry: Entry) -> None:
+        self.entries.append(entry)
+
+    def finish(self, engine: Engine) -> None:
+        """Note the current state, so a replay can check it ended up in the same place"""
+        self.end_state = state_digest(engine)
+
+    def save(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(
+                {
+                    "version": JOURNAL_VERSION,
+                    "seed": self.seed,
+                    "end_state": self.end_state,
+                    "entries": self.entries,
+                },
+                f,
+                separators=(",", ":"),
+            )
+
+    @classmethod
+    def load(cls, filename: str) -> Journal:
+        with open(filename) as f:
+            data = json.load(f)
+        if data.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"Unsupported journal version {data.get('version')}")
+        journal = cls(data["seed"])
+        journal.entries = data["entries"]
+        journal.end_state = data["end_state"]
+        return journal
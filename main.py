@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
-from multiprocessing.synchronize import Event
-
+import time
 import traceback
+from typing import Any, Iterable, List, Optional, Tuple
 
 import tcod
 
+import assets
 import color
 import exceptions
 import input_handlers
+import perf_hud
 import setup_game
+import slow_turns
+import timing
 
 
 
@@ -19,50 +23,118 @@ def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
         print("Game Saved")
 
 
+def save_journal(handler: input_handlers.BaseEventHandler, filename: str) -> None:
+    """If the current event handler has a recorded game, write its journal for replay.py"""
+    if isinstance(handler, input_handlers.EventHandler) and handler.engine.journal is not None:
+        handler.engine.journal.finish(handler.engine)
+        handler.engine.journal.save(filename)
+
+
+def coalesce_motion(events: Iterable[tcod.event.Event]) -> List[tcod.event.Event]:
+    """
+    Return 'events' without the mouse motions superseded by a later motion
+
+    Only the last of each run of motions is kept, so any other event still sees the cursor
+    where it was when that event happened
+    """
+    coalesced: List[tcod.event.Event] = []
+    motion: Optional[tcod.event.Event] = None
+    for event in events:
+        if isinstance(event, tcod.event.MouseMotion):
+            motion = event
+            continue
+        if motion is not None:
+            coalesced.append(motion)
+            motion = None
+        coalesced.append(event)
+    if motion is not None:
+        coalesced.append(motion)
+    return coalesced
+
+
+def render_state(handler: input_handlers.BaseEventHandler) -> Tuple[Any, ...]:
+    """What mouse motion can change on screen, the active handler and the cursor of its engine"""
+    if isinstance(handler, input_handlers.EventHandler):
+        return handler, handler.engine.cursor_location
+    return (handler,)
+
+
+def handle_event_batch(
+    handler: input_handlers.BaseEventHandler,
+    events: Iterable[tcod.event.Event],
+    context: Any,
+) -> Tuple[input_handlers.BaseEventHandler, bool]:
+    """
+    Dispatch one batch of events from tcod.event.wait to the handlers
+
+    Returns the next active handler and whether the screen needs to be rendered again,
+    which is only false when the batch was nothing but mouse motion which changed nothing
+    """
+    changed = False
+    try:
+        for event in coalesce_motion(events):
+            context.convert_event(event)
+            before = render_state(handler)
+            with timing.span("main.handle_event"):
+                handler = handler.handle_events(event)
+            if not isinstance(event, tcod.event.MouseMotion) or render_state(handler) != before:
+                changed = True
+    except Exception: # handle exceptions in game
+        traceback.print_exc() # print error to stderr
+        # then print the error to the message log
+        if isinstance(handler, input_handlers.EventHandler):
+            handler.engine.message_log.add_message(
+                traceback.format_exc(), color.error
+            )
+        changed = True
+    return handler, changed
+
+
 def main() -> None:
 
     screen_width = 80
     screen_height = 50
 
-    tileset = tcod.tileset.load_tilesheet(
-        "terminal.png", 16, 16, tcod.tileset.CHARMAP_CP437
-    )
+    # decoded while the window opens, the main menu waits for it on its first frame
+    assets.preload_menu_background()
 
     handler: input_handlers.BaseEventHandler = setup_game.MainMenu()
     
     with tcod.context.new_terminal(
         screen_width,
         screen_height,
-        tileset=tileset,
+        tileset=assets.tileset(),
         title="Neo Komodo",
         renderer=tcod.context.RENDERER_SDL2,
         vsync=True,
     ) as context:
         root_console = tcod.Console(screen_width, screen_height, order="F")
         try:
+            changed = True
             while True:
-                root_console.clear()
-                handler.on_render(console=root_console)
-                context.present(root_console)
-                
-                try:
-                    for event in tcod.event.wait():
-                        context.convert_event(event)
-                        handler = handler.handle_events(event)
-                except Exception: # handle exceptions in game
-                    traceback.print_exc() # print error to stderr
-                    # then print the error to the message log
-                    if isinstance(handler, input_handlers.EventHandler):
-                        handler.message_log.add_message(
-                            traceback.format_exc(), color.error
-                        )
+                if changed:
+                    engine = handler.engine if isinstance(handler, input_handlers.EventHandler) else None
+                    frame_start = time.perf_counter()
+                    with timing.span("main.frame"), slow_turns.frames.watch(engine):
+                        root_console.clear()
+                        handler.on_render(console=root_console)
+                        # drawn over the finished frame so a modal's cached backdrop never holds it
+                        if engine is not None and perf_hud.visible:
+                            perf_hud.render(engine, root_console)
+                        context.present(root_console)
+                    perf_hud.stats.frame_seconds = time.perf_counter() - frame_start
+
+                handler, changed = handle_event_batch(handler, tcod.event.wait(), context)
         except exceptions.QuitWithoutSaving:
+            save_journal(handler, "session.journal")
             raise
         except SystemExit: # save and quit
             save_game(handler, "savegame.sav")
+            save_journal(handler, "session.journal")
             raise
         except BaseException: # save on any other unexpected exception
             save_game(handler, "savegame.sav")
+            save_journal(handler, "session.journal")
             raise
 
 
@@ -0,0 +1,213 @@
+"""
+Memory accounting with tracemalloc, per subsystem and per floor
+
+Every traced allocation is attributed to the subsystem of the innermost frame of its traceback
+which falls under FUNCTION_RULES or MODULE_RULES, e.g. an array numpy allocates inside
+GameMap._new_bitmask counts as "fov", memory allocated while importing a module counts as "imports",
+anything else counts as "other"
+Memory which was already allocated when start() was called, such as the modules imported before,
+is left out of the subsystems
+
+Start tracing with the NEOKOMODO_MEMORY environment variable, the F4 debug key, headless.py --memory
+or start(), after which every GameWorld.generate_floor records what is in use,
+so growth from floor to floor, and so leaks, show up in the report
+"""
+from __future__ import annotations
+
+import gc
+import importlib
+import inspect
+import json
+import os
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+NFRAMES = 25 # deep enough to reach the game's frames from inside numpy and the stdlib
+DEFAULT_PATH = "memory_report.json"
+
+SUBSYSTEMS = ("tiles", "fov", "entities", "components", "ai_paths", "message_log", "imports", "other")
+
+# (subsystem, module, qualified name), checked before the module rules
+FUNCTION_RULES = (
+    ("ai_paths", "components.ai", "BaseAI.get_path_to"),
+    ("ai_paths", "auto_commands", "distance_map"),
+    ("fov", "engine", "Engine.update_fov"),
+    ("fov", "game_map", "GameMap._new_bitmask"),
+    ("tiles", "game_map", "GameMap._new_layer"),
+    ("tiles", "game_map", "GameMap.refresh_masks"),
+    ("tiles", "game_map", "GameMap.set_tiles"),
+    ("tiles", "game_map", "GameMap._unshare_tiles"),
+    ("tiles", "game_map", "GameMap._new_decals"),
+    ("tiles", "game_map", "GameMap.add_decal"),
+)
+# (subsystem, module), a module ending in "." covers the whole package
+MODULE_RULES = (
+    ("fov", "bitmask"),
+    ("tiles", "procgen"),
+    ("entities", "entity"),
+    ("entities", "entity_factories"),
+    ("entities", "actor_table"),
+    ("components", "components."),
+    ("message_log", "message_log"),
+)
+
+# filename -> [(first line, last line, subsystem)], functions first
+Rules = Dict[str, List[Tuple[int, int, str]]]
+_rules: Optional[Rules] = None
+
+floors: List[Dict[str, Any]] = []
+_baseline: Optional[tracemalloc.Snapshot] = None
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def _build_rules() -> Rules:
+    rules: Rules = {}
+    for subsystem, module_name, qualname in FUNCTION_RULES:
+        target: Any = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            target = getattr(target, part)
+        lines, first = inspect.getsourcelines(inspect.unwrap(target))
+        filename = inspect.getsourcefile(inspect.unwrap(target))
+        assert filename is not None
+        rules.setdefault(os.path.abspath(filename), []).append((first, first + len(lines) - 1, subsystem))
+
+    for subsystem, module_name in MODULE_RULES:
+        if module_name.endswith("."):
+            package = importlib.import_module(module_name[:-1])
+            directory = os.path.dirname(os.path.abspath(package.__file__ or ""))
+            filenames = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".py")]
+        else:
+            filenames = [os.path.abspath(importlib.import_module(module_name).__file__ or "")]
+        for filename in filenames:
+            rules.setdefault(filename, []).append((0, 1 << 30, subsystem))
+    return rules
+
+
+def _subsystem(traceback: tracemalloc.Traceback, rules: Rules) -> str:
+    # frames run from the oldest to the most recent, the innermost match wins
+    for frame in reversed(traceback):
+        if frame.filename.startswith("<frozen importlib"):
+            return "imports" # code run while importing a module belongs to no subsystem
+        for first, last, subsystem in rules.get(os.path.abspath(frame.filename), ()):
+            if first <= frame.lineno <= last:
+                return subsystem
+    return "other"
+
+
+def attribute(
+    snapshot: tracemalloc.Snapshot, baseline: Optional[tracemalloc.Snapshot] = None
+) -> Dict[str, int]:
+    """Return the bytes allocated by each of SUBSYSTEMS in 'snapshot', less what was allocated in 'baseline'"""
+    global _rules
+    if _rules is None:
+        _rules = _build_rules()
+    sizes = dict.fromkeys(SUBSYSTEMS, 0)
+    if baseline is None:
+        allocations = [(trace.traceback, trace.size) for trace in snapshot.traces]
+    else:
+        allocations = [(stat.traceback, stat.size_diff) for stat in snapshot.compare_to(baseline, "traceback")]
+    seen: Dict[tracemalloc.Traceback, str] = {}
+    for traceback, size in allocations:
+        subsystem = seen.get(traceback)
+        if subsystem is None:
+            subsystem = seen[traceback] = _subsystem(traceback, _rules)
+        sizes[subsystem] += size
+    return sizes
+
+
+def is_tracing() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def start() -> None:
+    """Start tracing if it isn't already, and take what is allocated now as the baseline of the reports"""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(NFRAMES)
+    _baseline = take_snapshot()
+
+
+def stop() -> None:
+    global _baseline, _last_snapshot
+    tracemalloc.stop()
+    _baseline = _last_snapshot = None
+
+
+def clear_floors() -> None:
+    """Forget the per floor history, for a new game in the same process"""
+    global _last_snapshot
+    floors.clear()
+    _last_snapshot = None
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """Collect garbage first, so only memory which is still reachable is counted"""
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+    return snapshot.filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    )
+
+
+def top_sites(stats: List[tracemalloc.StatisticDiff], limit: int = 10) -> List[Dict[str, Any]]:
+    return [
+        {
+            "site": f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}",
+            "bytes": stat.size,
+            "growth_bytes": stat.size_diff,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def floor_generated(floor: int) -> None:
+    """Called by GameWorld.generate_floor, records the memory in use after every new floor while tracing"""
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        return
+    snapshot = take_snapshot()
+    sizes = attribute(snapshot, _baseline)
+    entry: Dict[str, Any] = {"floor": floor, "total_bytes": sum(sizes.values()), "subsystems": sizes}
+    if floors:
+        previous = floors[-1]
+        entry["growth_bytes"] = entry["total_bytes"] - previous["total_bytes"]
+        entry["subsystem_growth"] = {name: sizes[name] - previous["subsystems"][name] for name in SUBSYSTEMS}
+    if _last_snapshot is not None:
+        entry["top_growth"] = top_sites(snapshot.compare_to(_last_snapshot, "lineno"))
+    floors.append(entry)
+    _last_snapshot = snapshot
+
+
+def report(engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """Return the memory in use now by subsystem, the biggest allocation sites and the per floor history"""
+    snapshot = take_snapshot()
+    traced, peak = tracemalloc.get_traced_memory()
+    result: Dict[str, Any] = {
+        "traced_bytes": traced,
+        "peak_bytes": peak,
+        "baseline_bytes": sum(trace.size for trace in _baseline.traces) if _baseline is not None else 0,
+        "subsystems": attribute(snapshot, _baseline),
+        "top_sites": [
+            {"site": f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}", "bytes": stat.size}
+            for stat in snapshot.statistics("lineno")[:15]
+        ],
+        "floors": floors,
+    }
+    if engine is not None:
+        result["floor"] = engine.game_world.current_floor
+        result["entity_count"] = len(engine.game_map.entities)
+        result["message_count"] = len(engine.message_log.messages)
+    return result
+
+
+def write(path: str = DEFAULT_PATH, engine: Optional[Engine] = None) -> None:
+    with open(path, "w") as f:
+        json.dump(report(engine), f, indent=2)
+
+
+_setting = os.environ.get("NEOKOMODO_MEMORY", "")
+if _setting and _setting != "0":
+    start()
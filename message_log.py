@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from typing import Iterable, List, Reversible, Tuple
 import textwrap
 
@@ -19,9 +21,23 @@ class Message:
         return self.plain_text
 
 class MessageLog:
+    # counts every add_message, so renders of the log can be cached until it changes
+    # a class default for logs saved before it existed
+    changes = 0
+
     def __init__(self) -> None:
         self.messages: List[Message] = []
 
+    def fork(self) -> MessageLog:
+        """Return a copy of this log, older messages are shared as only the last one can change"""
+        fork = MessageLog()
+        fork.messages = self.messages.copy()
+        if fork.messages:
+            last = fork.messages[-1]
+            fork.messages[-1] = Message(last.plain_text, last.fg)
+            fork.messages[-1].count = last.count
+        return fork
+
     def add_message(
         self,
         text: str,
@@ -39,6 +55,7 @@ class MessageLog:
             self.messages[-1].count +=1
         else:
             self.messages.append(Message(text, fg))
+        self.changes += 1
 
     def render(
         self,
@@ -0,0 +1,71 @@
+"""A toggleable overlay showing frame and turn costs, for spotting regressions while playtesting"""
+from __future__ import annotations
+
+import time
+from typing import Optional, TYPE_CHECKING
+
+import tcod
+
+import color
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+HUD_WIDTH = 22
+HUD_HEIGHT = 8
+
+
+class PerfStats:
+    """
+    The latest costs, written by the main loop, EventHandler.handle_action and the engine
+
+    Kept here rather than on the Engine so they are never saved
+    """
+
+    def __init__(self) -> None:
+        self.frame_seconds = 0.0
+        self.turn_seconds = 0.0
+        self.fov_seconds = 0.0
+        self.path_calls = 0 # pathfinding calls in the last turn
+        self.turn_start = 0.0
+
+    def begin_turn(self) -> None:
+        self.path_calls = 0
+        self.turn_start = time.perf_counter()
+
+    def end_turn(self) -> None:
+        self.turn_seconds = time.perf_counter() - self.turn_start
+
+
+stats = PerfStats()
+visible = False
+_console: Optional[tcod.Console] = None
+
+
+def toggle() -> None:
+    global visible
+    visible = not visible
+
+
+def render(engine: Engine, console: tcod.Console) -> None:
+    """Draw the overlay in the top right corner of 'console'"""
+    global _console
+    if _console is None:
+        _console = tcod.Console(HUD_WIDTH, HUD_HEIGHT, order="F")
+    hud = _console
+    hud.clear()
+    hud.draw_frame(0, 0, HUD_WIDTH, HUD_HEIGHT, title="Perf", fg=color.white, bg=color.black)
+
+    game_map = engine.game_map
+    lines = (
+        f"frame  {stats.frame_seconds * 1e3:7.2f} ms",
+        f"turn   {stats.turn_seconds * 1e3:7.2f} ms",
+        f"fov    {stats.fov_seconds * 1e3:7.2f} ms",
+        f"paths  {stats.path_calls:7}",
+        f"actors {len(game_map.actor_table.live_rows()):7}",
+        f"ents   {len(game_map.entities):7}",
+    )
+    for y, line in enumerate(lines, start=1):
+        hud.print(1, y, line, fg=color.white)
+
+    hud.blit(console, console.width - HUD_WIDTH - 1, 1, bg_alpha=0.8)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import itertools
+import math
 import random
-from typing import Iterator, List, Tuple, TYPE_CHECKING
+from typing import Iterator, List, Optional, Tuple, TYPE_CHECKING
 
+import numpy as np # type: ignore
 import tcod
 
-import entity_factories
 from game_map import GameMap
+import spawn_tables
 import tile_types
 
 if TYPE_CHECKING:
@@ -46,43 +49,33 @@ class RectangularRoom:
         )
 
 def place_entities(
-    room: RectangularRoom,
+    rooms: List[RectangularRoom],
     dungeon: GameMap,
+    floor_number: int,
     maximum_monsters: int,
     maximum_items: int,
 ) -> None:
-    number_of_monsters = random.randint(0, maximum_monsters)
-    number_of_items = random.randint(0, maximum_items)
-
-    for i in range(number_of_monsters):
-        x = random.randint(room.x1 + 1, room.x2 - 2)
-        y = random.randint(room.y1 + 1, room.y2 - 2)
-
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            monster_chance = random.random()
-            if monster_chance < 0.8:
-                entity_factories.menace.spawn(dungeon, x, y)
-            else:
-                entity_factories.droid.spawn(dungeon, x, y)
-
-    for i in range(number_of_items):
-        x = random.randint(room.x1 + 1, room.x2 - 2)
-        y = random.randint(room.y1 + 1, room.y2 - 2)
-
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            item_chance = random.random()
-            if item_chance < 0.4:
-                entity_factories.menace_energy.spawn(dungeon, x, y)
-            elif item_chance < 0.6:
-                entity_factories.large_menace_energy.spawn(dungeon, x, y)
-            elif item_chance < 0.7: 
-                entity_factories.lightning_gun.spawn(dungeon, x, y)
-            elif item_chance < 0.8:
-                entity_factories.cpu_hack.spawn(dungeon, x, y)
-            elif item_chance < 0.9:
-                entity_factories.flame_burst.spawn(dungeon, x, y)
-            else:
-                entity_factories.cpu_overload.spawn(dungeon, x, y)
+    """Populate every room of the floor, drawing all spawns from the depth's tables at once"""
+    tables = spawn_tables.load()
+
+    monster_counts = [random.randint(0, maximum_monsters) for _ in rooms]
+    item_counts = [random.randint(0, maximum_items) for _ in rooms]
+
+    monsters = iter(tables.monsters_for(floor_number).sample_many(sum(monster_counts)))
+    items = iter(tables.items_for(floor_number).sample_many(sum(item_counts)))
+
+    occupied = {(entity.x, entity.y) for entity in dungeon.entities}
+
+    for room, number_of_monsters, number_of_items in zip(rooms, monster_counts, item_counts):
+        # monsters go down first so they keep priority over items for free tiles
+        for prototypes, count in ((monsters, number_of_monsters), (items, number_of_items)):
+            for prototype in itertools.islice(prototypes, count):
+                x = random.randint(room.x1 + 1, room.x2 - 2)
+                y = random.randint(room.y1 + 1, room.y2 - 2)
+
+                if (x, y) not in occupied:
+                    prototype.spawn(dungeon, x, y)
+                    occupied.add((x, y))
 
 def tunnel_between(
     start: Tuple[int, int], end: Tuple[int, int]
@@ -104,6 +97,84 @@ def tunnel_between(
         yield x, y
 
 
+# how many times a floor layout can be rejected before generation gives up
+max_generation_attempts = 10
+
+
+def label_regions(walkable: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Label the connected walkable regions of a map
+
+    Regions are found with an 8-way flood fill, matching how actors can move
+    Returns an array where each walkable tile holds its region number (starting at 1)
+    and non-walkable tiles hold 0, along with the number of regions found
+    """
+    walkable = np.asarray(walkable, dtype=bool)
+    labels = np.zeros(walkable.shape, dtype=np.int32, order="F")
+    cost = walkable.astype(np.int8)
+    region_count = 0
+
+    unlabeled = walkable.copy()
+    while unlabeled.any():
+        region_count += 1
+        seed = np.unravel_index(np.argmax(unlabeled), unlabeled.shape)
+
+        # flood fill from the seed, every reached tile belongs to this region
+        dist = tcod.path.maxarray(walkable.shape, dtype=np.int32, order="F")
+        dist[seed] = 0
+        tcod.path.dijkstra2d(dist, cost, 1, 1, out=dist)
+        region = dist != np.iinfo(np.int32).max
+
+        labels[region] = region_count
+        unlabeled &= ~region
+
+    return labels, region_count
+
+
+def connect_regions(dungeon: GameMap, rooms: List[RectangularRoom]) -> bool:
+    """
+    Make every walkable tile of the dungeon reachable from the first room
+
+    Orphan regions that contain a room are tunneled back to the nearest connected room,
+    orphan regions without a room are filled in with wall
+    Returns True if the stairs and every room end up connected to the first room
+    """
+    labels, region_count = label_regions(dungeon.walkable)
+    start_region = labels[rooms[0].center]
+
+    for region in range(1, region_count + 1):
+        if region == start_region:
+            continue
+
+        orphan_rooms = [room for room in rooms if labels[room.center] == region]
+        if not orphan_rooms:
+            # a pocket with no room in it, nothing worth reaching
+            dungeon.set_tiles(labels == region, tile_types.wall)
+            continue
+
+        connected_rooms = [room for room in rooms if labels[room.center] == start_region]
+        start, end = min(
+            (
+                (orphan.center, connected.center)
+                for orphan in orphan_rooms
+                for connected in connected_rooms
+            ),
+            key=lambda pair: math.dist(*pair),
+        )
+        for x, y in tunnel_between(start, end):
+            if not dungeon.walkable[x, y]:
+                dungeon.set_tiles((x, y), tile_types.floor)
+
+    # tunnels can cut through other regions, so check the final layout from scratch
+    labels, region_count = label_regions(dungeon.walkable)
+    start_region = labels[rooms[0].center]
+
+    return bool(
+        labels[dungeon.downstairs_location] == start_region
+        and all(labels[room.center] == start_region for room in rooms)
+    )
+
+
 def generate_dungeon(
     max_rooms: int,
     room_min_size: int,
@@ -113,14 +184,62 @@ def generate_dungeon(
     max_monsters_per_room: int,
     max_items_per_room: int,
     engine: Engine,
+    floor_number: int = 1,
+    chunk_size: Optional[int] = None,
+    chunk_directory: Optional[str] = None,
 ) -> GameMap:
-    """Generate a new Dungeon Map"""
-    player = engine.player
-    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+    """
+    Generate a new Dungeon Map
+
+    Layouts where the stairs or any room can't be reached are rejected and regenerated
+    """
+    for _ in range(max_generation_attempts):
+        dungeon, rooms = generate_layout(
+            max_rooms=max_rooms,
+            room_min_size=room_min_size,
+            room_max_size=room_max_size,
+            map_width=map_width,
+            map_height=map_height,
+            engine=engine,
+            chunk_size=chunk_size,
+            chunk_directory=chunk_directory,
+        )
+        if rooms and connect_regions(dungeon, rooms):
+            break
+    else:
+        raise RuntimeError(
+            f"Failed to generate a connected dungeon after {max_generation_attempts} attempts"
+        )
+
+    # the player starts in the center of the first room
+    engine.player.place(*rooms[0].center, dungeon)
+
+    # place monsters and items in rooms
+    place_entities(rooms, dungeon, floor_number, max_monsters_per_room, max_items_per_room)
+
+    return dungeon
 
-    rooms: List[RectangularRoom] = []
 
-    center_of_last_room = (0, 0)
+def generate_layout(
+    max_rooms: int,
+    room_min_size: int,
+    room_max_size: int,
+    map_width: int,
+    map_height: int,
+    engine: Engine,
+    chunk_size: Optional[int] = None,
+    chunk_directory: Optional[str] = None,
+) -> Tuple[GameMap, List[RectangularRoom]]:
+    """Dig out the rooms, tunnels and stairs of a new map, without any entities"""
+    dungeon = GameMap(
+        engine,
+        map_width,
+        map_height,
+        chunk_size=chunk_size,
+        chunk_directory=chunk_directory,
+    )
+
+    rooms: List[RectangularRoom] = []
 
     for r in range(max_rooms):
         room_width = random.randint(room_min_size, room_max_size)
@@ -136,30 +255,26 @@ def generate_dungeon(
             continue # this room intersects, so go to the next attempt
         #if there are no intersections then the room is valid
         # set the room to roomwalls
-        dungeon.tiles[new_room.room] = tile_types.roomwall
+        dungeon.set_tiles(new_room.room, tile_types.roomwall)
         # dig out the inner area
-        dungeon.tiles[new_room.inner] = tile_types.floor
+        dungeon.set_tiles(new_room.inner, tile_types.floor)
 
         # finally append room to list
         rooms.append(new_room)
 
+    if not rooms:
+        return dungeon, rooms
+
     # dig tunnels through the roomwall
     for i, room in enumerate(rooms):
-        if i == 0:
-            # this means this is the first room, where player will start
-            player.place(*room.center, dungeon)
-        else: #for all other rooms
+        if i > 0:
             # dig out a tunnel between this room and the last
             for x, y in tunnel_between(rooms[i-1].center, room.center):
-                dungeon.tiles[x,y] = tile_types.floor
-
-    # place monsters in rooms
-    for room in rooms:
-        place_entities(room, dungeon, max_monsters_per_room, max_items_per_room)
+                dungeon.set_tiles((x, y), tile_types.floor)
 
     # place down stairs in center of last room generated
-    center_of_last_room = rooms[(len(rooms)) - 1].center
-    dungeon.tiles[center_of_last_room] = tile_types.down_stairs
+    center_of_last_room = rooms[-1].center
+    dungeon.set_tiles(center_of_last_room, tile_types.down_stairs)
     dungeon.downstairs_location = center_of_last_room
 
-    return dungeon
\ No newline at end of file
+    return dungeon, rooms
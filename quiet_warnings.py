@@ -0,0 +1,9 @@
+"""
+Imported first by the command line tools, so the FutureWarnings tcod raises while the game is imported
+and run stay out of their output
+
+The game still uses the old tcod.event.K_* key constants, which newer versions of tcod warn about
+"""
+import warnings
+
+warnings.simplefilter("ignore", FutureWarning)
@@ -0,0 +1,97 @@
+"""
+Replay a recorded session headlessly and time every turn
+
+Journals are written by main.py as session.journal, a save file's own journal can be replayed too
+
+    python replay.py session.journal [--top N] [--json FILE]
+    python replay.py savegame.sav
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import quiet_warnings # noqa: F401, before the game's modules
+from actions import LevelUpAction
+from exceptions import Impossible
+from journal import Journal, state_digest
+import setup_game
+
+
+def load_journal(filename: str) -> Journal:
+    if filename.endswith(".sav"):
+        journal = setup_game.load_game(filename).journal
+        if journal is None:
+            raise ValueError(f"{filename} was saved before games were recorded")
+        return journal
+    return Journal.load(filename)
+
+
+def replay(journal: Journal) -> Dict[str, Any]:
+    """
+    Play every entry of 'journal' from its seed, the same way EventHandler.handle_action would
+
+    Returns the seconds each turn took, the entries which failed, and whether the game ended
+    in the recorded state
+    """
+    engine = setup_game.new_game(journal.seed)
+    turn_seconds: List[float] = []
+    failed: List[int] = []
+
+    for index, entry in enumerate(journal.entries):
+        start = time.perf_counter()
+        try:
+            action = journal.decode(entry, engine)
+            action.perform()
+        except (Impossible, IndexError):
+            # the replay has drifted from the recording
+            failed.append(index)
+            continue
+        if not isinstance(action, LevelUpAction): # level ups don't take a turn
+            engine.handle_enemy_turns()
+            engine.update_fov()
+            turn_seconds.append(time.perf_counter() - start)
+
+    end_state = state_digest(engine)
+    return {
+        "seed": journal.seed,
+        "entries": len(journal),
+        "turn_seconds": turn_seconds,
+        "failed_entries": failed,
+        "end_state": end_state,
+        "matches_recording": journal.end_state is None or journal.end_state == end_state,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("journal", help="a journal file or a .sav file")
+    parser.add_argument("--top", type=int, default=5, help="list this many of the slowest turns")
+    parser.add_argument("--json", help="also write the per-turn times to this file")
+    args = parser.parse_args()
+
+    result = replay(load_journal(args.journal))
+    seconds = result["turn_seconds"]
+    ordered = sorted(seconds)
+    turns = len(seconds)
+
+    print(f"seed {result['seed']}, {result['entries']} entries, {turns} turns")
+    if turns:
+        print(f"total {sum(seconds):.3f}s, {turns / sum(seconds):.0f} turns/s")
+        for name, fraction in (("p50", 0.5), ("p95", 0.95), ("max", 1.0)):
+            print(f"{name}: {ordered[min(turns - 1, int(fraction * turns))] * 1e3:.3f}ms")
+        slowest = sorted(range(turns), key=seconds.__getitem__, reverse=True)[: args.top]
+        print("slowest turns: " + ", ".join(f"#{i} {seconds[i] * 1e3:.2f}ms" for i in slowest))
+    if result["failed_entries"]:
+        print(f"{len(result['failed_entries'])} entries could not be performed, first at #{result['failed_entries'][0]}")
+    print("end state matches the recording" if result["matches_recording"] else "end state DIFFERS from the recording")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
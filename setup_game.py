@@ -1,7 +1,6 @@
 """Handle the loading and initialization of game sessions"""
 from __future__ import annotations
 
-import copy
 import lzma
 import pickle
 import traceback
@@ -10,22 +9,24 @@ from typing import Optional
 import tcod
 
 import random
+import assets
 import color
 from engine import Engine
 import entity_factories
 from game_map import GameWorld
 import input_handlers
-from procgen import generate_dungeon
+from journal import Journal
 
-# Load the background image and remove the alpha channel
+def new_game(seed: Optional[int] = None) -> Engine:
+    """
+    Return a brand new game session as an Engine instance
 
-if random.random() < 0.5:   
-    background_image = tcod.image.load("menu_background.png")[:, :, :3]
-else:
-    background_image = tcod.image.load("menu_background_2.png")[:, :, :3]
+    The same 'seed' always generates the same game, a random one is picked if not given
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    random.seed(seed)
 
-def new_game() -> Engine:
-    """Return a brand new game session as an Engine instance"""
     map_width = 80
     map_height = 60
 
@@ -36,9 +37,11 @@ def new_game() -> Engine:
     max_monsters_per_room = 2
     max_items_per_room = 2
 
-    player = copy.deepcopy(entity_factories.player)
+    player = entity_factories.player.clone()
 
     engine = Engine(player=player)
+    engine.seed = seed
+    engine.journal = Journal(seed)
 
     engine.game_world = GameWorld(
         engine=engine,
@@ -63,14 +66,21 @@ def load_game(filename: str) -> Engine:
     with open(filename, "rb") as f:
         engine = pickle.loads(lzma.decompress(f.read()))
     assert isinstance(engine, Engine)
+    # saves from before the random state was kept have none
+    random_state = vars(engine).pop("random_state", None)
+    if random_state is not None:
+        random.setstate(random_state)
     return engine
 
 class MainMenu(input_handlers.BaseEventHandler):
     """Handle the main menu rendering and input"""
 
-    def on_render(self, console: tcod.Console) -> None:
-        """Render the main menu on a background image"""
-        console.draw_semigraphics(background_image, 0, 0)
+    def __init__(self) -> None:
+        # the background and titles never change
+        self.backdrop = input_handlers.Backdrop(self.render_background)
+
+    def render_background(self, console: tcod.Console) -> None:
+        console.draw_semigraphics(assets.menu_background(), 0, 0)
 
         console.print(
             console.width // 2,
@@ -87,6 +97,10 @@ class MainMenu(input_handlers.BaseEventHandler):
             alignment=tcod.CENTER,
         )
 
+    def on_render(self, console: tcod.Console) -> None:
+        """Render the main menu on a background image"""
+        self.backdrop.draw(console)
+
         menu_width = 24
         for i, text in enumerate(
             ["[N] Play a new game", "[C] Continue last game", "[Q] Quit"]
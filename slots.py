@@ -0,0 +1,42 @@
+"""Pickle and copy support for the classes which use __slots__ instead of a per-instance __dict__"""
+from typing import Any, Dict, Iterable, Tuple
+
+_slot_names: Dict[type, Tuple[str, ...]] = {}
+
+
+def slot_names(cls: type) -> Tuple[str, ...]:
+    """Return every slot declared by 'cls' and its bases"""
+    names = _slot_names.get(cls)
+    if names is None:
+        found = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            found.extend((slots,) if isinstance(slots, str) else slots)
+        names = _slot_names[cls] = tuple(found)
+    return names
+
+
+def copy_slots(source: Any, target: Any, skip: Iterable[str] = ()) -> None:
+    """Shallow copy every set slot of 'source' onto 'target', except the ones in 'skip'"""
+    for name in slot_names(type(source)):
+        if name not in skip and hasattr(source, name):
+            setattr(target, name, getattr(source, name))
+
+
+def state_dict(state: Any) -> Dict[str, Any]:
+    """
+    Return pickled state as a single dict of attribute names to values
+
+    Accepts the (dict_state, slot_state) pair pickle produces for slotted classes,
+    as well as the plain attribute dict of saves made before the class had __slots__
+    """
+    if isinstance(state, tuple):
+        dict_state, slot_state = state
+        return {**(dict_state or {}), **(slot_state or {})}
+    return dict(state)
+
+
+def restore_slots(obj: Any, state: Any) -> None:
+    """Restore pickled state onto a slotted object"""
+    for name, value in state_dict(state).items():
+        setattr(obj, name, value)
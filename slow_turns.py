@@ -0,0 +1,170 @@
+"""
+Capture what was going on when a turn or frame took longer than its budget
+
+Budgets come from NEOKOMODO_TURN_BUDGET_MS and NEOKOMODO_FRAME_BUDGET_MS, unset means unwatched
+Captures go to NEOKOMODO_SLOW_DIR (default "slow_turns"), only the newest 'keep' are kept
+
+While a budget is set every watched run is profiled with cProfile, so even a slowdown which
+happens once is captured, a run over budget writes its profile next to a state summary
+and the profiles of the others are thrown away
+Profiling slows every run down, so set budgets while investigating rather than for normal play
+Only one profiler can run at a time, a turn watched inside a watched frame is left to the frame's profile
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from typing import Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+DEFAULT_DIRECTORY = "slow_turns"
+
+_profiling = False # a watch further out is already profiling
+
+
+def state_summary(engine: Optional[Engine]) -> dict:
+    """Return the sizes which usually explain a slow turn"""
+    if engine is None:
+        return {}
+    game_map = engine.game_map
+    return {
+        "floor": engine.game_world.current_floor,
+        "map_size": [game_map.width, game_map.height],
+        "chunked": game_map.chunk_size is not None,
+        "entity_count": len(game_map.entities),
+        "actor_count": len(game_map.actor_table.live_rows()),
+        "player": [engine.player.x, engine.player.y, engine.player.fighter.hp],
+        "message_count": len(engine.message_log.messages),
+    }
+
+
+class Watchdog:
+    """Watches one kind of work, such as turns or frames, against a budget in milliseconds"""
+
+    def __init__(
+        self,
+        kind: str,
+        budget_ms: Optional[float],
+        directory: str = DEFAULT_DIRECTORY,
+        keep: int = 20,
+    ):
+        self.kind = kind
+        self.budget = budget_ms / 1e3 if budget_ms else None
+        self.directory = directory
+        self.keep = keep
+        self.captures = 0
+
+    def watch(self, engine: Optional[Engine], label: Optional[str] = None) -> Any:
+        """
+        Return a context manager watching its block, which does nothing without a budget
+
+        'label' names what the block runs, such as the action's class, and is part of the capture's name
+        """
+        if self.budget is None:
+            return _null_watch
+        return _Watch(self, engine, label)
+
+    def capture(
+        self,
+        engine: Optional[Engine],
+        seconds: float,
+        profiler: Optional[cProfile.Profile],
+        label: Optional[str] = None,
+    ) -> None:
+        """Write the summary, and the profile if there is one"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.captures += 1
+        name = f"{self.kind}_{label}" if label else self.kind
+        stem = os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%d-%H%M%S')}_{self.captures:04}_{name}_{seconds * 1e3:.0f}ms",
+        )
+
+        summary = {
+            "kind": self.kind,
+            "label": label,
+            "milliseconds": round(seconds * 1e3, 3),
+            "budget_milliseconds": round(self.budget * 1e3, 3) if self.budget else None,
+            "profiled": profiler is not None,
+            "state": state_summary(engine),
+        }
+        with open(f"{stem}.json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+        if profiler is not None:
+            profiler.dump_stats(f"{stem}.prof")
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(30)
+            with open(f"{stem}.txt", "w") as f:
+                f.write(text.getvalue())
+
+        self.rotate()
+
+    def rotate(self) -> None:
+        """Delete the oldest captures beyond 'keep'"""
+        stems = sorted(
+            {name.rsplit(".", 1)[0] for name in os.listdir(self.directory) if f"_{self.kind}_" in name}
+        )
+        for stem in stems[: max(0, len(stems) - self.keep)]:
+            for extension in (".json", ".prof", ".txt"):
+                path = os.path.join(self.directory, stem + extension)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class _Watch:
+    __slots__ = ("watchdog", "engine", "label", "profiler", "start")
+
+    def __init__(self, watchdog: Watchdog, engine: Optional[Engine], label: Optional[str]):
+        self.watchdog = watchdog
+        self.engine = engine
+        self.label = label
+        self.profiler: Optional[cProfile.Profile] = None
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        global _profiling
+        if not _profiling:
+            _profiling = True
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        global _profiling
+        seconds = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profiling = False
+        budget = self.watchdog.budget
+        if budget is not None and seconds > budget:
+            self.watchdog.capture(self.engine, seconds, self.profiler, self.label)
+
+
+class _NullWatch:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_null_watch = _NullWatch()
+
+
+def _budget_from_env(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+_directory = os.environ.get("NEOKOMODO_SLOW_DIR", DEFAULT_DIRECTORY)
+turns = Watchdog("turn", _budget_from_env("NEOKOMODO_TURN_BUDGET_MS"), _directory)
+frames = Watchdog("frame", _budget_from_env("NEOKOMODO_FRAME_BUDGET_MS"), _directory)
@@ -0,0 +1,115 @@
+"""Weighted spawn tables for monsters and items, loaded from spawn_tables.json"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import random
+from typing import Dict, List, TYPE_CHECKING
+
+import numpy as np # type: ignore
+
+import entity_factories
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+SPAWN_TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spawn_tables.json")
+
+
+class AliasTable:
+    """
+    A weighted random choice between prototypes using the alias method
+
+    Building the table is O(n), after that every sample costs O(1)
+    no matter how many entries the table has
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        if not weights or min(weights.values()) < 0 or sum(weights.values()) <= 0:
+            raise ValueError(f"Spawn weights must be non-negative with a positive total: {weights}")
+
+        self.names: List[str] = list(weights)
+        self.prototypes: List[Entity] = [getattr(entity_factories, name) for name in self.names]
+
+        count = len(self.names)
+        total = sum(weights.values())
+        scaled = [weights[name] * count / total for name in self.names]
+
+        self.probability = np.ones(count, dtype=np.float64)
+        self.alias = np.arange(count, dtype=np.intp)
+
+        # Vose's method: pair each under-full column with an over-full one
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # anything left over is full up to floating point error
+
+    def sample(self) -> Entity:
+        """Return one prototype picked by weight"""
+        column = random.randrange(len(self.names))
+        if random.random() < self.probability[column]:
+            return self.prototypes[column]
+        return self.prototypes[self.alias[column]]
+
+    def sample_many(self, count: int) -> List[Entity]:
+        """Return 'count' prototypes picked by weight, drawn in a single vectorized pass"""
+        # seed from the global generator so a seeded game stays reproducible
+        rng = np.random.default_rng(random.getrandbits(64))
+        columns = rng.integers(0, len(self.names), size=count)
+        keep = rng.random(count) < self.probability[columns]
+        picks = np.where(keep, columns, self.alias[columns])
+        return [self.prototypes[i] for i in picks.tolist()]
+
+
+class SpawnTables:
+    """
+    The monster and item tables for every depth
+
+    Each table applies from its depth until a deeper table takes over
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, Dict[str, float]]]):
+        self.monsters = self._compile(data["monsters"])
+        self.items = self._compile(data["items"])
+
+    @staticmethod
+    def _compile(tables: Dict[str, Dict[str, float]]) -> Dict[int, AliasTable]:
+        return {
+            int(depth): AliasTable(weights)
+            for depth, weights in sorted(tables.items(), key=lambda item: int(item[0]))
+        }
+
+    @staticmethod
+    def _for_depth(tables: Dict[int, AliasTable], depth: int) -> AliasTable:
+        """Return the deepest table which applies at 'depth'"""
+        selected = None
+        for table_depth, table in tables.items():
+            if table_depth > depth:
+                break
+            selected = table
+        if selected is None:
+            # shallower than the first entry, so use the first entry
+            selected = next(iter(tables.values()))
+        return selected
+
+    def monsters_for(self, depth: int) -> AliasTable:
+        return self._for_depth(self.monsters, depth)
+
+    def items_for(self, depth: int) -> AliasTable:
+        return self._for_depth(self.items, depth)
+
+
+@functools.lru_cache(maxsize=None)
+def load(path: str = SPAWN_TABLES_PATH) -> SpawnTables:
+    """Load and compile the spawn tables, this is only done once per path"""
+    with open(path) as f:
+        return SpawnTables(json.load(f))
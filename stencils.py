@@ -0,0 +1,20 @@
+"""Precomputed shapes for area effects, shared by game logic and targeting overlays"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np # type: ignore
+
+
+@lru_cache(maxsize=None)
+def disk_stencil(radius: int) -> np.ndarray:
+    """
+    Return a (2 * radius + 1) square bool array of the tiles within 'radius' of its center
+
+    A tile is inside when its Euclidean distance to the center is at most 'radius'
+    The result is cached and read-only, index it with [dx + radius, dy + radius]
+    """
+    offsets = np.arange(-radius, radius + 1)
+    stencil = offsets[:, np.newaxis] ** 2 + offsets[np.newaxis, :] ** 2 <= radius * radius
+    stencil.flags.writeable = False
+    return stencil
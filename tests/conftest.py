@@ -0,0 +1,7 @@
+"""The tests import the game's modules, which live in the repository root"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quiet_warnings # noqa: F401, E402
@@ -0,0 +1,65 @@
+"""ActorTable rows must track their actors through attach, detach, radius queries and damage"""
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np # type: ignore
+
+from actor_table import ActorTable
+from entity import Actor
+import entity_factories
+
+
+def menaces(table: ActorTable, *positions: tuple) -> List[Actor]:
+    actors = []
+    for x, y in positions:
+        actor = entity_factories.menace.clone()
+        actor.x, actor.y = x, y
+        actor.attach(table)
+        actors.append(actor)
+    return actors
+
+
+def test_attach_fills_a_row_from_the_actor() -> None:
+    table = ActorTable(capacity=1)
+    first, second = menaces(table, (1, 2), (3, 4)) # the second add grows the table
+    assert len(table) == 2
+    assert (first.row, second.row) == (0, 1)
+    assert (table.x[1], table.y[1]) == (3, 4)
+    assert table.hp[0] == entity_factories.menace.fighter.hp
+    assert list(table.live_actors()) == [first, second]
+    assert table.rows_at(3, 4).tolist() == [1]
+
+
+def test_detach_copies_state_out_and_frees_the_row() -> None:
+    table = ActorTable()
+    first, second = menaces(table, (1, 2), (3, 4))
+    first.fighter.hp = 3
+    first.x = 5
+    first.detach()
+    assert first.table is None
+    assert (first.x, first.fighter.hp) == (5, 3)
+    assert table.live_rows().tolist() == [second.row]
+
+    (third,) = menaces(table, (7, 7))
+    assert third.row == 0 # the freed row is reused
+    assert len(table) == 2
+
+
+def test_rows_within_radius_follows_the_disk() -> None:
+    table = ActorTable()
+    centre, edge, corner, far = menaces(table, (10, 10), (13, 10), (13, 13), (20, 10))
+    rows = table.rows_within_radius(10, 10, 3)
+    assert sorted(rows.tolist()) == [centre.row, edge.row] # (13, 13) is outside a radius 3 disk
+    table.alive[far.row] = False
+    assert table.rows_within_radius(20, 10, 1).size == 0 # the dead are never in range
+
+
+def test_damage_stops_at_zero_and_reports_new_deaths() -> None:
+    table = ActorTable()
+    menaces(table, (0, 0), (1, 0), (2, 0))
+    table.hp[:3] = (3, 10, 0)
+    table.alive[2] = False # already dead at 0 hp
+    died = table.damage(np.arange(3), 5)
+    assert table.hp[:3].tolist() == [0, 5, 0]
+    assert died.tolist() == [0]
@@ -0,0 +1,51 @@
+"""BitMask must read and write like a bool array, including the padding bits of the last byte"""
+from __future__ import annotations
+
+import numpy as np # type: ignore
+import pytest
+
+from bitmask import BitMask, packed_shape
+from chunked_array import ChunkedArray
+
+
+def new_mask(width: int, height: int, chunked: bool) -> BitMask:
+    shape = packed_shape(width, height)
+    if chunked:
+        return BitMask(width, height, ChunkedArray(shape, np.uint8, 0, chunk_size=4))
+    return BitMask(width, height, np.zeros(shape, dtype=np.uint8, order="F"))
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+@pytest.mark.parametrize("width, height", [(8, 8), (5, 13), (11, 17), (3, 1)])
+def test_matches_a_bool_array(width: int, height: int, chunked: bool) -> None:
+    mask = new_mask(width, height, chunked)
+    dense = np.zeros((width, height), dtype=bool)
+    rng = np.random.default_rng(width * height)
+
+    mask[0:width, 0:height] = True # whole bytes, the padding bits of the last byte are set too
+    dense[:] = True
+    mask[1:width, 1:height - 1] = False
+    dense[1:width, 1:height - 1] = False
+    noise = rng.random((width, height)) < 0.5
+    mask[0:width, 0:height] = noise | dense
+    dense |= noise
+    mask[width - 1, height - 1] = False
+    dense[width - 1, height - 1] = False
+
+    assert mask.shape == (width, height)
+    assert np.array_equal(np.asarray(mask), dense)
+    assert mask[0:width, height - 1 : height + 5].shape == (width, 1) # clipped like a slice
+    xs, ys = np.nonzero(np.ones((width, height), dtype=bool))
+    assert np.array_equal(mask.get_cells(xs, ys), dense[xs, ys])
+    with pytest.raises(IndexError):
+        mask[0, height] # a padding bit, not a cell
+
+
+def test_forks_copy_dense_bits_on_write() -> None:
+    mask = new_mask(4, 10, chunked=False)
+    mask[1, 9] = True
+    fork = mask.fork()
+    fork[1, 9] = False
+    mask[2, 0] = True
+    assert (mask[1, 9], fork[1, 9]) == (True, False)
+    assert (mask[2, 0], fork[2, 0]) == (True, False)
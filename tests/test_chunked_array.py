@@ -0,0 +1,65 @@
+"""ChunkedArray must behave like a dense array while only allocating the chunks written to"""
+from __future__ import annotations
+
+import os
+
+import numpy as np # type: ignore
+
+from chunked_array import ChunkedArray
+
+
+def test_chunks_are_allocated_on_first_write() -> None:
+    array = ChunkedArray((100, 70), np.uint8, 7, chunk_size=32)
+    assert array[99, 69] == 7
+    assert array.nbytes == 0
+
+    array[5, 5] = 7 # the fill value, nothing to store
+    assert not array.chunks
+    array[40, 65] = 1
+    assert list(array.chunks) == [(1, 2)]
+
+    dense = np.full((100, 70), 7, dtype=np.uint8)
+    dense[40, 65] = 1
+    assert np.array_equal(np.asarray(array), dense)
+    assert np.array_equal(array[30:50, 60:70], dense[30:50, 60:70])
+
+
+def test_region_and_masked_writes_match_a_dense_array() -> None:
+    array = ChunkedArray((50, 40), np.int16, 0, chunk_size=16)
+    dense = np.zeros((50, 40), dtype=np.int16)
+    array[10:40, 5:20] = 3
+    dense[10:40, 5:20] = 3
+
+    mask = np.zeros((50, 40), dtype=bool)
+    mask[0:10:3, 30:38:2] = True
+    values = np.arange(50 * 40, dtype=np.int16).reshape(50, 40)
+    array[mask] = values
+    dense[mask] = values[mask]
+    assert np.array_equal(np.asarray(array), dense)
+    # chunks neither write touched are left unallocated
+    assert set(array.chunks) == {(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1), (0, 2)}
+
+
+def test_forks_copy_chunks_on_write() -> None:
+    array = ChunkedArray((64, 64), np.uint8, 0, chunk_size=16)
+    array[0:64, 0:16] = 1
+    fork = array.fork()
+    assert fork.chunks[0, 0] is array.chunks[0, 0]
+
+    fork[1, 1] = 2
+    array[20, 2] = 3
+    assert (array[1, 1], fork[1, 1]) == (1, 2)
+    assert (array[20, 2], fork[20, 2]) == (3, 1)
+    assert fork.chunks[2, 0] is array.chunks[2, 0] # untouched chunks are still shared
+
+
+def test_memmapped_chunks_keep_their_files_apart(tmp_path) -> None:
+    array = ChunkedArray((32, 32), np.uint8, 0, chunk_size=16, directory=str(tmp_path))
+    array[0, 0] = 1
+    assert array.files_directory and len(os.listdir(array.files_directory)) == 1
+
+    fork = array.fork()
+    array[0, 1] = 2 # the shared chunk is copied into a new file, the old one is removed
+    assert len(os.listdir(array.files_directory)) == 1
+    assert (fork[0, 0], fork[0, 1]) == (1, 0)
+    assert (array[0, 0], array[0, 1]) == (1, 2)
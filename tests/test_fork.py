@@ -0,0 +1,52 @@
+"""Whatever happens in a forked game must never show up in the game it was forked from"""
+from __future__ import annotations
+
+import numpy as np # type: ignore
+import pytest
+
+import setup_game
+import tile_types
+
+
+@pytest.mark.parametrize("chunk_size", [None, 16])
+def test_fork_changes_do_not_leak_back(chunk_size) -> None:
+    engine = setup_game.new_game(2)
+    if chunk_size:
+        engine.game_world.chunk_size = chunk_size
+        engine.game_world.generate_floor()
+        engine.update_fov()
+    game_map = engine.game_map
+    player = engine.player
+    monster = next(actor for actor in game_map.actors if actor is not player)
+    position, hp = (player.x, player.y), player.fighter.hp
+    monster_hp = monster.fighter.hp
+    tiles = np.array(game_map.tiles)
+    explored = np.array(game_map.explored)
+    messages = [message.full_text for message in engine.message_log.messages]
+    entities = len(game_map.entities)
+
+    fork = engine.fork()
+    fork_map = fork.game_map
+    assert fork.player is not player and fork_map is not game_map
+    fork_monster = fork_map.get_actor_at_location(monster.x, monster.y)
+    assert fork_monster is not None and fork_monster is not monster
+
+    fork.player.place(player.x + 1, player.y)
+    fork.player.fighter.hp -= 5
+    fork_monster.fighter.hp = 1
+    fork_map.set_tiles((slice(0, 5), slice(0, 5)), tile_types.floor)
+    fork_map.explored[0 : fork_map.width, 0 : fork_map.height] = True
+    fork_map.remove_entity(fork_monster)
+    fork.message_log.add_message("only in the fork")
+
+    assert (player.x, player.y, player.fighter.hp) == (*position, hp)
+    assert monster.fighter.hp == monster_hp and monster.table is game_map.actor_table
+    assert game_map.get_actor_at_location(monster.x, monster.y) is monster
+    assert np.array_equal(np.array(game_map.tiles), tiles)
+    assert np.array_equal(np.array(game_map.explored), explored)
+    assert [message.full_text for message in engine.message_log.messages] == messages
+    assert len(game_map.entities) == entities
+
+    # and the other way around
+    game_map.set_tiles((slice(10, 12), slice(10, 12)), tile_types.wall)
+    assert np.array_equal(np.array(fork_map.tiles)[10:12, 10:12], tiles[10:12, 10:12])
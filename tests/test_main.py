@@ -0,0 +1,29 @@
+"""Batches of events from the window must reach the handlers with only redundant motion dropped"""
+from __future__ import annotations
+
+import tcod
+
+from main import coalesce_motion
+
+
+def motion(x: int, y: int) -> tcod.event.MouseMotion:
+    return tcod.event.MouseMotion(position=(x, y))
+
+
+def key(sym: int) -> tcod.event.KeyDown:
+    return tcod.event.KeyDown(scancode=0, sym=sym, mod=0)
+
+
+def test_only_the_last_motion_of_each_run_is_kept() -> None:
+    first, second, third, fourth = motion(1, 1), motion(2, 2), motion(3, 3), motion(4, 4)
+    press, other = key(tcod.event.K_PERIOD), key(tcod.event.K_ESCAPE)
+    events = [first, second, press, third, other, fourth, motion(5, 5)]
+    coalesced = coalesce_motion(events)
+    assert coalesced[:4] == [second, press, third, other]
+    assert coalesced[4].position == (5, 5) and len(coalesced) == 5
+
+
+def test_batches_without_motion_are_unchanged() -> None:
+    events = [key(tcod.event.K_a), key(tcod.event.K_b)]
+    assert coalesce_motion(events) == events
+    assert coalesce_motion([]) == []
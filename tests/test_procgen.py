@@ -0,0 +1,36 @@
+"""Every generated floor must be a single region reachable from where the player starts"""
+from __future__ import annotations
+
+import pytest
+
+from game_map import GameMap
+from procgen import RectangularRoom, connect_regions, label_regions
+import setup_game
+import tile_types
+
+
+def test_connect_regions_joins_rooms_and_fills_pockets() -> None:
+    engine = setup_game.new_game(1)
+    dungeon = GameMap(engine, 40, 20)
+    rooms = [RectangularRoom(1, 1, 6, 6), RectangularRoom(30, 10, 6, 6)]
+    for room in rooms:
+        dungeon.set_tiles(room.inner, tile_types.floor)
+    dungeon.set_tiles((slice(15, 18), slice(2, 4)), tile_types.floor) # a pocket without a room
+    dungeon.set_tiles(rooms[1].center, tile_types.down_stairs)
+    dungeon.downstairs_location = rooms[1].center
+    assert label_regions(dungeon.walkable)[1] == 3
+
+    assert connect_regions(dungeon, rooms)
+    assert label_regions(dungeon.walkable)[1] == 1
+    assert not dungeon.walkable[15:18, 2:4].any()
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_generated_floors_are_one_region(seed: int) -> None:
+    engine = setup_game.new_game(seed)
+    for _ in range(3):
+        game_map = engine.game_map
+        labels, region_count = label_regions(game_map.walkable)
+        assert region_count == 1
+        assert labels[engine.player.x, engine.player.y] == labels[game_map.downstairs_location] == 1
+        engine.game_world.generate_floor()
@@ -0,0 +1,76 @@
+"""A session saved and continued in a new process must still replay from its seed"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a simple player pressing keys for 'turns' turns, starting a new game or continuing a save,
+# then saves again and prints the floors it started and ended on
+# random numbers are only drawn when a floor is generated, so it heads for the stairs
+PLAY = """
+import sys
+import quiet_warnings
+import tcod
+import input_handlers, setup_game
+from auto_commands import ExploreCommand, TravelCommand
+from exceptions import Impossible
+
+seed, turns, save, journal = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3], sys.argv[4]
+engine = setup_game.new_game(seed) if journal == "-" else setup_game.load_game(save)
+first_floor = engine.game_world.current_floor
+handler = input_handlers.MainGameEventHandler(engine)
+move_keys = {direction: key for key, direction in input_handlers.MOVE_KEYS.items()}
+for _ in range(turns):
+    if isinstance(handler, input_handlers.GameOverEventHandler):
+        break
+    player, game_map = engine.player, engine.game_map
+    stairs = game_map.downstairs_location
+    enemy = game_map.nearest_visible_actor(player.x, player.y, 1.5, exclude=player)
+    key, mod = tcod.event.K_PERIOD, 0
+    if isinstance(handler, input_handlers.LevelUpEventHandler):
+        key = tcod.event.K_a
+    elif not isinstance(handler, input_handlers.MainGameEventHandler):
+        key = tcod.event.K_ESCAPE
+    elif enemy:
+        key = move_keys[enemy.x - player.x, enemy.y - player.y]
+    elif (player.x, player.y) == stairs:
+        key, mod = tcod.event.K_PERIOD, tcod.event.KMOD_LSHIFT
+    else:
+        # the step the travel or explore command would take, without stopping for enemies in view
+        command = TravelCommand(engine, *stairs) if game_map.explored[stairs] else ExploreCommand(engine)
+        try:
+            step = command.next_action()
+        except Impossible:
+            step = None
+        if step is not None:
+            key = move_keys[step.dx, step.dy]
+    handler = handler.handle_events(tcod.event.KeyDown(scancode=0, sym=key, mod=mod))
+engine.journal.finish(engine)
+engine.save_as(save)
+if journal != "-":
+    engine.journal.save(journal)
+print(first_floor, engine.game_world.current_floor)
+"""
+
+
+def run(*args: object) -> str:
+    return subprocess.run(
+        [sys.executable, *map(str, args)], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def test_replay_across_save_and_load(tmp_path) -> None:
+    save = tmp_path / "game.sav"
+    journal = tmp_path / "session.journal"
+    run("-c", PLAY, 0, 150, save, "-")
+    # a fresh process starts from a different random state than the one the game was saved in
+    first_floor, last_floor = map(int, run("-c", PLAY, 0, 150, save, journal).split())
+    assert last_floor > first_floor # or nothing after loading drew a random number
+
+    for recording in (journal, save):
+        output = run("replay.py", recording)
+        assert "could not be performed" not in output
+        assert "end state matches the recording" in output
@@ -0,0 +1,51 @@
+"""
+Saves written by earlier versions of the game must still load and play
+
+Each save in tests/saves was made by that version from random.seed(5): a new game,
+a Menace Energy picked up, 3 hp lost and a dozen bumps around the start
+"""
+from __future__ import annotations
+
+import os
+
+import numpy as np # type: ignore
+import pytest
+
+from bitmask import BitMask
+import setup_game
+
+SAVES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saves")
+
+# save -> player x, y, hp when saved
+EXPECTED = {
+    "baseline.sav": (8, 35, 14), # tiles as tile_dt records, bool masks, no actor table, no slots
+    "actor_table.sav": (6, 32, 13), # before __slots__
+    "slots.sav": (6, 32, 13), # before entity kinds
+    "entity_kinds.sav": (6, 32, 13),
+}
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_old_save_loads_and_plays(name: str) -> None:
+    engine = setup_game.load_game(os.path.join(SAVES, name))
+    player = engine.player
+    game_map = engine.game_map
+
+    assert (player.x, player.y, player.fighter.hp) == EXPECTED[name]
+    assert (player.fighter.power, player.fighter.defense) == (5, 2)
+    assert [item.name for item in player.inventory.items] == ["Menace Energy"]
+    assert game_map.tiles.dtype == np.uint8
+    assert isinstance(game_map.visible, BitMask) and isinstance(game_map.explored, BitMask)
+    assert game_map.visible[player.x, player.y]
+    # every actor on the map has its row, and the table agrees with it
+    for entity in game_map.entities:
+        if hasattr(entity, "table"):
+            assert entity.table is game_map.actor_table
+            assert game_map.actor_table.actors[entity.row] is entity
+    assert game_map.get_actor_at_location(player.x, player.y) is player
+
+    engine.handle_enemy_turns()
+    engine.update_fov()
+    fork = engine.fork()
+    fork.game_world.generate_floor()
+    assert engine.game_world.current_floor == 1 and fork.game_world.current_floor == 2
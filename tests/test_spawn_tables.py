@@ -0,0 +1,43 @@
+"""Spawn tables must pick each prototype in proportion to its weight"""
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+import entity_factories
+from spawn_tables import AliasTable
+
+WEIGHTS = {"menace": 60, "droid": 30, "menace_energy": 9, "lightning_gun": 1}
+
+
+def frequencies(picks: list) -> dict:
+    counts = Counter(pick.name for pick in picks)
+    return {name: counts[getattr(entity_factories, name).name] / len(picks) for name in WEIGHTS}
+
+
+@pytest.mark.parametrize("method", ["sample", "sample_many"])
+def test_sampling_follows_the_weights(method: str) -> None:
+    table = AliasTable(WEIGHTS)
+    random.seed(0)
+    draws = 40_000
+    if method == "sample":
+        picks = [table.sample() for _ in range(draws)]
+    else:
+        picks = table.sample_many(draws)
+    total = sum(WEIGHTS.values())
+    for name, frequency in frequencies(picks).items():
+        assert frequency == pytest.approx(WEIGHTS[name] / total, abs=0.01)
+
+
+def test_zero_weights_are_never_picked() -> None:
+    table = AliasTable({"menace": 1, "droid": 0})
+    random.seed(0)
+    assert {pick.name for pick in table.sample_many(1000)} == {entity_factories.menace.name}
+
+
+@pytest.mark.parametrize("weights", [{}, {"menace": -1, "droid": 2}, {"menace": 0}])
+def test_invalid_weights_are_rejected(weights: dict) -> None:
+    with pytest.raises(ValueError):
+        AliasTable(weights)
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Tuple
 
 import numpy as np # type: ignore
 
@@ -21,6 +21,13 @@ tile_dt = np.dtype(
     ]
 )
 
+# Maps store one of these per cell, an index into tile_table
+tile_id_dt = np.dtype(np.uint8)
+
+# Every registered tile type, indexed by tile ID
+tile_table = np.zeros(0, dtype=tile_dt)
+tile_names: List[str] = []
+
 def new_tile(
     *, # enforce use of keywords so that parameter order doesn't matter
     walkable: int,
@@ -31,31 +38,75 @@ def new_tile(
     """Helper function for defining individual tile types"""
     return np.array((walkable, transparent, dark, light), dtype=tile_dt)
 
+def register_tile(
+    name: str,
+    *,
+    walkable: int,
+    transparent: int,
+    dark: Tuple[int, Tuple[int, int, int], Tuple[int, int, int]],
+    light: Tuple[int, Tuple[int, int, int], Tuple[int, int, int]],
+) -> int:
+    """
+    Add a tile type to tile_table and return its tile ID
+
+    The tile's properties are looked up from the table by ID,
+    so maps only need to store the ID for each cell
+    """
+    global tile_table
+    if len(tile_names) > np.iinfo(tile_id_dt).max:
+        raise ValueError(f"Too many tile types to register {name!r}")
+    tile_table = np.append(
+        tile_table,
+        new_tile(walkable=walkable, transparent=transparent, dark=dark, light=light),
+    )
+    tile_names.append(name)
+    return len(tile_names) - 1
+
+def tile_ids(tiles: np.ndarray) -> np.ndarray:
+    """
+    Return the tile IDs of an array of tile_dt records, as maps held before they stored IDs
+
+    Raises ValueError if a record matches no registered tile type
+    """
+    ids = np.zeros(tiles.shape, dtype=tile_id_dt, order="F")
+    matched = np.zeros(tiles.shape, dtype=bool, order="F")
+    for tile_id, record in enumerate(tile_table):
+        same = tiles == record
+        ids[same] = tile_id
+        matched |= same
+    if not matched.all():
+        raise ValueError("The map holds tiles which are not a registered tile type")
+    return ids
+
 # SHROUD represents fog of war (unexplored, unseen tiles)
 SHROUD = np.array((ord(" "), (255, 255, 255), (0, 0, 0)), dtype=graphic_dt)
 
-floor = new_tile(
+floor = register_tile(
+    "floor",
     walkable=True, 
     transparent=True, 
     dark=(ord("."), (100, 100, 100), (0, 0, 0)),
     light=(ord("."), (200, 200, 200), (0, 0, 0)),  
 )
 
-wall = new_tile(
+wall = register_tile(
+    "wall",
     walkable=False, 
     transparent=False, 
     dark=(ord(" "), (50, 50, 50), (0, 0, 0)),
     light=(ord(" "), (100, 100, 100), (0, 0, 0)),
 )
 
-roomwall = new_tile(
+roomwall = register_tile(
+    "roomwall",
     walkable=False, 
     transparent=False, 
     dark=(ord("#"), (100, 100, 100), (0, 0, 0)),
     light=(ord("#"), (200, 200, 200), (0, 0, 0)),
 )
 
-down_stairs = new_tile(
+down_stairs = register_tile(
+    "down_stairs",
     walkable=True,
     transparent=True,
     dark=(ord(">"), (100, 100, 100), (0, 0, 0)),
@@ -0,0 +1,151 @@
+"""
+Optional timing of the game's hot paths
+
+Spans record how long a named piece of code took, keeping a rolling window of samples per name
+Enable with the NEOKOMODO_TIMING environment variable, set to 1 or to the JSON file to export to,
+or by calling enable(), the stats are written to the file when the program exits
+
+While disabled a span costs one function call and a flag check
+"""
+from __future__ import annotations
+
+import atexit
+import collections
+import functools
+import json
+import os
+import time
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+WINDOW = 1000 # samples kept per span for the percentiles
+DEFAULT_EXPORT_PATH = "timing.json"
+
+enabled = False
+export_path: Optional[str] = None
+
+
+class SpanStats:
+    """Every sample count and total of one span, and a rolling window of recent samples"""
+
+    __slots__ = ("count", "total", "max", "window")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window: Deque[float] = collections.deque(maxlen=WINDOW)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.window.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Return the stats in milliseconds, the percentiles cover the rolling window"""
+        ordered = sorted(self.window)
+        def percentile(fraction: float) -> float:
+            return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1e3, 3),
+            "p50_ms": round(percentile(0.5) * 1e3, 4),
+            "p95_ms": round(percentile(0.95) * 1e3, 4),
+            "max_ms": round(self.max * 1e3, 4),
+        }
+
+
+stats: Dict[str, SpanStats] = {}
+
+
+def record(name: str, seconds: float) -> None:
+    span_stats = stats.get(name)
+    if span_stats is None:
+        span_stats = stats[name] = SpanStats()
+    span_stats.add(seconds)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        record(self.name, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_null_span = _NullSpan()
+
+
+def span(name: str, detail: Optional[str] = None) -> Any:
+    """
+    Return a context manager timing its block as 'name', or 'name.detail' if a detail is given
+
+    The detail is only joined on when enabled, so callers can pass e.g. a class name for free
+    """
+    if not enabled:
+        return _null_span
+    return _Span(f"{name}.{detail}" if detail else name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorate a function so every call to it is timed as 'name'"""
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper # type: ignore
+    return decorate
+
+
+def summary() -> Dict[str, Dict[str, float]]:
+    return {name: stats[name].summary() for name in sorted(stats)}
+
+
+def export(path: Optional[str] = None) -> None:
+    """Write the summary of every span to 'path', by default the path given when enabling"""
+    with open(path or export_path or DEFAULT_EXPORT_PATH, "w") as f:
+        json.dump(summary(), f, indent=2)
+
+
+def enable(path: Optional[str] = None) -> None:
+    """Start recording spans, and export them to 'path' when the program exits"""
+    global enabled, export_path
+    if not enabled:
+        atexit.register(export)
+    enabled = True
+    export_path = path or DEFAULT_EXPORT_PATH
+
+
+def disable() -> None:
+    global enabled
+    enabled = False
+
+
+_setting = os.environ.get("NEOKOMODO_TIMING", "")
+if _setting and _setting != "0":
+    enable(_setting if _setting.endswith(".json") else None)